@@ -0,0 +1,145 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import DateTime, delete, exists, insert, literal, or_, select
+from sqlalchemy.orm import Session, aliased
+from app.config import settings
+from app.database import SessionLocal
+from app.dedup import CLOSED_STATUSES, discard_primary
+from app.geo import forget_item
+from app.models import ARCHIVE_MODELS, Comment, IncidentReport, Message, SOSRequest, Task
+from app.logs import get_logger, log_event
+
+logger = get_logger(__name__)
+
+
+def _move(db: Session, model, ids: List[int], archived_at: datetime) -> int:
+    """Copy rows into the model's archive table and delete them from the live table"""
+    if not ids:
+        return 0
+    live = model.__table__
+    archive = ARCHIVE_MODELS[model].__table__
+    db.execute(
+        insert(archive).from_select(
+            [column.name for column in live.columns] + ["archived_at"],
+            select(*live.columns, literal(archived_at, DateTime)).where(live.c.id.in_(ids))
+        )
+    )
+    db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+    return len(ids)
+
+
+def archivable_sos_ids(db: Session, cutoff: datetime, limit: int) -> List[int]:
+    """Closed primary SOS requests untouched since `cutoff`, with their linked duplicates.
+
+    A primary qualifies only when none of its tasks, and none of its
+    duplicates or their tasks, are still open, so the whole group moves at once.
+    """
+    open_task = exists().where(Task.sos_request_id == SOSRequest.id, Task.status.notin_(CLOSED_STATUSES))
+    duplicate = aliased(SOSRequest)
+    duplicate_task = aliased(Task)
+    open_duplicate = exists().where(
+        duplicate.duplicate_of_id == SOSRequest.id,
+        or_(
+            duplicate.status.notin_(CLOSED_STATUSES),
+            exists().where(duplicate_task.sos_request_id == duplicate.id,
+                           duplicate_task.status.notin_(CLOSED_STATUSES))
+        )
+    )
+    primary_ids = db.scalars(
+        select(SOSRequest.id).where(
+            SOSRequest.duplicate_of_id.is_(None),
+            SOSRequest.status.in_(CLOSED_STATUSES),
+            SOSRequest.updated_at < cutoff,
+            ~open_task,
+            ~open_duplicate
+        ).order_by(SOSRequest.id).limit(limit)
+    ).all()
+    if not primary_ids:
+        return []
+    duplicate_ids = db.scalars(select(SOSRequest.id).where(SOSRequest.duplicate_of_id.in_(primary_ids))).all()
+    return list(primary_ids) + list(duplicate_ids)
+
+
+def archivable_incident_ids(db: Session, cutoff: datetime, limit: int) -> List[int]:
+    """Closed incidents untouched since `cutoff` with no open task"""
+    open_task = exists().where(Task.incident_report_id == IncidentReport.id, Task.status.notin_(CLOSED_STATUSES))
+    return list(db.scalars(
+        select(IncidentReport.id).where(
+            IncidentReport.status.in_(CLOSED_STATUSES),
+            IncidentReport.updated_at < cutoff,
+            ~open_task
+        ).order_by(IncidentReport.id).limit(limit)
+    ))
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> Dict[str, int]:
+    """Move one batch of closed items, their tasks, comments and messages, in one transaction"""
+    archived_at = datetime.utcnow()
+    sos_ids = archivable_sos_ids(db, cutoff, batch_size)
+    incident_ids = archivable_incident_ids(db, cutoff, batch_size)
+
+    task_ids = []
+    if sos_ids or incident_ids:
+        task_ids = list(db.scalars(
+            select(Task.id).where(or_(Task.sos_request_id.in_(sos_ids), Task.incident_report_id.in_(incident_ids)))
+        ))
+    comment_ids = list(db.scalars(select(Comment.id).where(Comment.task_id.in_(task_ids)))) if task_ids else []
+    task_message_ids = list(db.scalars(select(Message.id).where(Message.task_id.in_(task_ids)))) if task_ids else []
+
+    # Direct chats and broadcasts that are old and no longer unread
+    standalone_message_ids = list(db.scalars(
+        select(Message.id).where(
+            Message.task_id.is_(None),
+            Message.created_at < cutoff,
+            or_(Message.is_read == True, Message.is_broadcast == True)
+        ).order_by(Message.id).limit(batch_size)
+    ))
+
+    # Children are removed before the rows they reference
+    moved = {
+        "comments": _move(db, Comment, comment_ids, archived_at),
+        "messages": _move(db, Message, task_message_ids + standalone_message_ids, archived_at),
+        "tasks": _move(db, Task, task_ids, archived_at),
+        "sos_requests": _move(db, SOSRequest, sos_ids, archived_at),
+        "incident_reports": _move(db, IncidentReport, incident_ids, archived_at),
+    }
+    db.commit()
+
+    for sos_id in sos_ids:
+        discard_primary(sos_id)
+        forget_item("sos", sos_id)
+    for incident_id in incident_ids:
+        forget_item("incident", incident_id)
+    return moved
+
+
+def archive_closed_items(older_than_days: Optional[float] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Archive everything eligible, one short transaction per batch"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.ARCHIVE_AFTER_DAYS if older_than_days is None
+                                           else older_than_days)
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    totals = Counter()
+    db = SessionLocal()
+    try:
+        while True:
+            moved = archive_batch(db, cutoff, batch_size)
+            totals.update(moved)
+            if not any(moved.values()):
+                break
+    finally:
+        db.close()
+    return {table: totals[table] for table in moved}
+
+
+async def archive_periodically(interval: float):
+    """Background loop moving closed items to the archive tables every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            moved = await asyncio.to_thread(archive_closed_items)
+            if any(moved.values()):
+                log_event(logger, "records_archived", **moved)
+        except Exception:
+            logger.exception("Archival failed")
@@ -1,30 +1,32 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
+from app.hashing import check_password, hash_password, password_hasher
+from app.identity import UserIdentity, identity_cache
 from app.models import User, UserRole
 from app.schemas import TokenData
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.tokens import revoked_refresh_tokens
 
 # Bearer token security
 security = HTTPBearer()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify a password against its hash (blocking; startup and scripts only)"""
+    return check_password(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
+    """Hash a password (blocking; startup and scripts only)"""
+    return hash_password(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -44,7 +46,7 @@ def create_refresh_token(data: dict) -> str:
     """Create JWT refresh token"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -56,7 +58,7 @@ def decode_token(token: str) -> TokenData:
         user_id: int = payload.get("sub")
         role: str = payload.get("role")
         
-        if user_id is None:
+        if user_id is None or payload.get("type") != "access":
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials"
@@ -71,15 +73,57 @@ def decode_token(token: str) -> TokenData:
         )
 
 
+def rotate_refresh_token(token: str, db: Session) -> dict:
+    """Exchange a refresh token for a new access/refresh pair, revoking the old one.
+
+    The user must still exist and be active, and the new tokens carry their
+    current role. That check goes through the identity cache, so renewal
+    usually skips the database, and it never runs bcrypt.
+    """
+    credentials_error = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token"
+    )
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise credentials_error
+    
+    jti = payload.get("jti")
+    if payload.get("type") != "refresh" or not jti:
+        raise credentials_error
+    
+    identity = identity_cache.get(user_id)
+    if identity is None:
+        row = db.execute(select(User.id, User.role, User.is_active).where(User.id == user_id)).first()
+        if row is not None:
+            identity = UserIdentity(*row)
+            identity_cache.put(identity)
+    if identity is None or not identity.is_active:
+        raise credentials_error
+    
+    # revoke() is atomic, so a token can only ever be rotated once
+    if not revoked_refresh_tokens.revoke(jti, int(payload["exp"])):
+        raise credentials_error
+    
+    claims = {"sub": str(identity.id), "role": identity.role.value}
+    return {
+        "access_token": create_access_token(data=claims),
+        "refresh_token": create_refresh_token(data=claims),
+    }
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
-    """Get current authenticated user"""
+    """Get current authenticated user (loaded through the request's AsyncSession)"""
     token = credentials.credentials
     token_data = decode_token(token)
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    result = await db.execute(select(User).where(User.id == token_data.user_id))
+    user = result.scalar_one_or_none()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -92,10 +136,42 @@ async def get_current_user(
             detail="Inactive user"
         )
     
+    identity_cache.put(UserIdentity.from_user(user))
     return user
 
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_identity(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> UserIdentity:
+    """Get current user's id, role and active flag, skipping the database on a cache hit"""
+    token_data = decode_token(credentials.credentials)
+    
+    identity = identity_cache.get(token_data.user_id)
+    if identity is None:
+        row = (await db.execute(
+            select(User.id, User.role, User.is_active).where(User.id == token_data.user_id)
+        )).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        identity = UserIdentity(*row)
+        identity_cache.put(identity)
+        # Hand the connection back now; sync routes run their queries on a separate Session
+        await db.rollback()
+    
+    if not identity.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user"
+        )
+    
+    return identity
+
+
+async def get_current_admin(current_user: UserIdentity = Depends(get_current_identity)) -> UserIdentity:
     """Verify current user is admin"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -105,7 +181,7 @@ async def get_current_admin(current_user: User = Depends(get_current_user)) -> U
     return current_user
 
 
-async def get_current_volunteer(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_volunteer(current_user: UserIdentity = Depends(get_current_identity)) -> UserIdentity:
     """Verify current user is volunteer"""
     if current_user.role != UserRole.VOLUNTEER:
         raise HTTPException(
@@ -115,7 +191,7 @@ async def get_current_volunteer(current_user: User = Depends(get_current_user))
     return current_user
 
 
-async def get_current_citizen(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_citizen(current_user: UserIdentity = Depends(get_current_identity)) -> UserIdentity:
     """Verify current user is citizen"""
     if current_user.role != UserRole.CITIZEN:
         raise HTTPException(
@@ -125,18 +201,18 @@ async def get_current_citizen(current_user: User = Depends(get_current_user)) ->
     return current_user
 
 
-def authenticate_user(db: Session, identifier: str, password: str, role: Optional[UserRole] = None) -> Optional[User]:
+async def authenticate_user(db: AsyncSession, identifier: str, password: str,
+                            role: Optional[UserRole] = None) -> Optional[User]:
     """Authenticate a user by identifier (email, phone, or volunteer_id) and password"""
     # Try to find user by email, phone, or volunteer_id
-    query = db.query(User)
-    
-    user = None
     if "@" in identifier:
-        user = query.filter(User.email == identifier).first()
+        query = select(User).where(User.email == identifier)
     elif identifier.startswith("VOL"):
-        user = query.filter(User.volunteer_id == identifier).first()
+        query = select(User).where(User.volunteer_id == identifier)
     else:
-        user = query.filter(User.phone == identifier).first()
+        query = select(User).where(User.phone == identifier)
+    
+    user = await db.scalar(query)
     
     if not user:
         return None
@@ -145,7 +221,7 @@ def authenticate_user(db: Session, identifier: str, password: str, role: Optiona
     if role and user.role != role:
         return None
     
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return None
     
     return user
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# Batched events and the payload key identifying the entity they describe
+BATCHED_EVENTS: Dict[str, str] = {
+    "task_updated": "id",
+    "user_location_updated": "user_id",
+    "volunteer_status_changed": "id",
+    "incident_updated": "id",
+}
+
+# Name of the frame carrying a batch: [[event, data], ...]
+BATCH_EVENT = "batch"
+
+# Buffer key for events sent to every client
+ALL_CLIENTS = "*"
+
+
+def parse_room_windows(value: str) -> Dict[str, float]:
+    """"room=ms,prefix*=ms" -> {room or prefix*: seconds}"""
+    windows = {}
+    for item in value.split(","):
+        if "=" in item:
+            room, window_ms = item.rsplit("=", 1)
+            windows[room.strip()] = max(float(window_ms), 0.0) / 1000
+    return windows
+
+
+def merge_updates(previous: dict, data: dict) -> dict:
+    """Fold a newer update into a pending one; merged versioned deltas span both (see app.deltas)"""
+    merged = dict(previous)
+    for key, value in data.items():
+        earlier = merged.get(key)
+        if isinstance(value, dict) and isinstance(earlier, dict) and value.get("id") == earlier.get("id"):
+            merged[key] = merge_updates(earlier, value)
+        else:
+            merged[key] = value
+    if "base_version" in previous:
+        merged["base_version"] = previous["base_version"]
+    return merged
+
+
+class EventBatcher:
+    """Coalesce chatty per-entity events into one frame per room per tick.
+
+    The first event for a room opens a window; events arriving before it
+    closes are merged by entity id (later fields win), and the room then gets
+    one `batch` frame holding the latest state of every entity that changed.
+    Rooms whose window is 0 are sent each event immediately.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[..., Awaitable],
+        default_window: float,
+        room_windows: Optional[Dict[str, float]] = None,
+        enabled: bool = True,
+    ):
+        self._emit = emit
+        self.default_window = default_window
+        self.room_windows = room_windows or {}
+        self.enabled = enabled
+        self._pending: Dict[str, Dict[Tuple[str, object], dict]] = {}
+        self._flushes: Set[asyncio.Task] = set()
+
+    def window_for(self, room: str) -> float:
+        if room in self.room_windows:
+            return self.room_windows[room]
+        prefixes = [key for key in self.room_windows if key.endswith("*") and room.startswith(key[:-1])]
+        if prefixes:
+            return self.room_windows[max(prefixes, key=len)]
+        return self.default_window
+
+    async def emit(self, event: str, data: dict, rooms: Optional[List[str]] = None):
+        """Queue an event for the given rooms (every client when None)"""
+        immediate = []
+        for room in rooms or [ALL_CLIENTS]:
+            window = self.window_for(room)
+            if not self.enabled or window <= 0 or event not in BATCHED_EVENTS:
+                immediate.append(room)
+                continue
+            self._add(room, event, data, window)
+
+        if immediate:
+            await self._emit(event, data, room=None if immediate == [ALL_CLIENTS] else immediate)
+
+    def _add(self, room: str, event: str, data: dict, window: float):
+        pending = self._pending.get(room)
+        if pending is None:
+            pending = self._pending[room] = {}
+            asyncio.get_running_loop().call_later(window, self._schedule_flush, room)
+        key = (event, data.get(BATCHED_EVENTS[event]))
+        previous = pending.pop(key, None)
+        # Re-inserted so the batch lists entities in the order they last changed
+        pending[key] = merge_updates(previous, data) if previous else data
+
+    def _schedule_flush(self, room: str):
+        task = asyncio.ensure_future(self.flush(room))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self, room: str):
+        pending = self._pending.pop(room, None)
+        if pending:
+            frame = [[event, data] for (event, _), data in pending.items()]
+            await self._emit(BATCH_EVENT, frame, room=None if room == ALL_CLIENTS else room)
+
+    async def flush_all(self):
+        """Send everything still buffered (on shutdown)"""
+        await asyncio.gather(*(self.flush(room) for room in list(self._pending)))
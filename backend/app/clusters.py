@@ -0,0 +1,150 @@
+import math
+import threading
+from typing import Dict, Hashable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models import SOSRequest, IncidentReport
+
+MAX_ZOOM = 16
+
+
+class ClusterCell:
+    """Aggregated counts for every item falling in one grid cell"""
+
+    __slots__ = ("count", "lat_sum", "lon_sum", "by_status", "by_type")
+
+    def __init__(self):
+        self.count = 0
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+        self.by_status: Dict[str, int] = {}
+        self.by_type: Dict[str, int] = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "latitude": self.lat_sum / self.count,
+            "longitude": self.lon_sum / self.count,
+            "count": self.count,
+            "by_status": dict(self.by_status),
+            "by_type": dict(self.by_type),
+        }
+
+
+def _bump(counts: Dict[str, int], key: str, delta: int):
+    value = counts.get(key, 0) + delta
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+class ClusterIndex:
+    """Multi-zoom grid clusters of SOS requests and incidents, kept up to date incrementally.
+
+    Each zoom level has cells `cell_pixels` wide on a 256px world tile, so a
+    map request only reads pre-aggregated cells for its bounding box.
+    """
+
+    def __init__(self, max_zoom: int = MAX_ZOOM, cell_pixels: int = 64):
+        self.max_zoom = max_zoom
+        self._cell_sizes = [360 / (2 ** zoom) * cell_pixels / 256 for zoom in range(max_zoom + 1)]
+        self._levels: List[Dict[Tuple[int, int], ClusterCell]] = [{} for _ in range(max_zoom + 1)]
+        self._items: Dict[Hashable, Tuple[float, float, str, str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _cell(self, zoom: int, latitude: float, longitude: float) -> Tuple[int, int]:
+        size = self._cell_sizes[zoom]
+        return math.floor((latitude + 90) / size), math.floor((longitude + 180) / size)
+
+    def _apply(self, item: Tuple[float, float, str, str], delta: int):
+        latitude, longitude, category, item_status = item
+        for zoom, level in enumerate(self._levels):
+            cell_key = self._cell(zoom, latitude, longitude)
+            cell = level.get(cell_key)
+            if cell is None:
+                cell = level[cell_key] = ClusterCell()
+            cell.count += delta
+            cell.lat_sum += latitude * delta
+            cell.lon_sum += longitude * delta
+            _bump(cell.by_status, item_status, delta)
+            _bump(cell.by_type, category, delta)
+            if not cell.count:
+                del level[cell_key]
+
+    def upsert(self, key: Hashable, latitude: float, longitude: float, status: str,
+               category: Optional[str] = None):
+        """Add or move an item; category defaults to the one already recorded"""
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._apply(previous, -1)
+                category = category or previous[2]
+            item = (latitude, longitude, category or "other", status)
+            self._items[key] = item
+            self._apply(item, 1)
+
+    def set_status(self, key: Hashable, status: str):
+        """Change only the status of an indexed item"""
+        with self._lock:
+            previous = self._items.get(key)
+            if previous is None or previous[3] == status:
+                return
+            self._apply(previous, -1)
+            item = previous[:3] + (status,)
+            self._items[key] = item
+            self._apply(item, 1)
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._apply(previous, -1)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            for level in self._levels:
+                level.clear()
+
+    def query(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float, zoom: int) -> List[dict]:
+        """Return the clusters whose cells intersect a bounding box at a zoom level"""
+        zoom = max(0, min(zoom, self.max_zoom))
+        row_min, col_min = self._cell(zoom, min_lat, min_lon)
+        row_max, col_max = self._cell(zoom, max_lat, max_lon)
+
+        with self._lock:
+            level = self._levels[zoom]
+            span = (row_max - row_min + 1) * (col_max - col_min + 1)
+            if span <= len(level):
+                cells = (
+                    level.get((row, col))
+                    for row in range(row_min, row_max + 1)
+                    for col in range(col_min, col_max + 1)
+                )
+            else:
+                cells = (
+                    cell for (row, col), cell in level.items()
+                    if row_min <= row <= row_max and col_min <= col <= col_max
+                )
+            return [cell.to_dict() for cell in cells if cell is not None]
+
+    def rebuild(self, db: Session) -> int:
+        """Load every SOS request and incident from the database"""
+        self.clear()
+        for sos_id, latitude, longitude, sos_status in db.query(
+            SOSRequest.id, SOSRequest.latitude, SOSRequest.longitude, SOSRequest.status
+        ).filter(SOSRequest.duplicate_of_id.is_(None)):
+            self.upsert(("sos", sos_id), latitude, longitude, sos_status.value, "sos")
+
+        for incident_id, latitude, longitude, incident_status, incident_type in db.query(
+            IncidentReport.id, IncidentReport.latitude, IncidentReport.longitude,
+            IncidentReport.status, IncidentReport.incident_type
+        ):
+            self.upsert(("incident", incident_id), latitude, longitude, incident_status.value, incident_type.value)
+
+        return len(self._items)
+
+
+map_clusters = ClusterIndex()
@@ -6,14 +6,90 @@ class Settings(BaseSettings):
     """Application settings"""
     
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: str = ""  # Derived from DATABASE_URL when empty
+    DATABASE_REPLICA_URLS: str = ""  # Comma-separated read replicas for GET routes
+    REPLICA_MAX_LAG_SECONDS: float = 5
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 10
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_REVOCATION_FILE: str = ""  # Journal of rotated refresh token ids, written on every rotation, when set
+    
+    # Cached id/role/is_active per user for request authorization
+    AUTH_CACHE_TTL_SECONDS: float = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
     ADMIN_EMAIL: str
     ADMIN_PASSWORD: str
     CORS_ORIGINS: str = "http://localhost:3000"
     
+    # Keyset pagination on list endpoints
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 500
+    
+    # Database connection pool budget per worker, split between the sync and async engines
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_ASYNC_POOL_SHARE: float = 0.5  # Fraction of the budget given to the event-loop (AsyncSession) engine
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    
+    # bcrypt process pool (queued + running operations beyond the limit get a 503)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
+    
+    # Automatic SOS dispatch
+    AUTO_DISPATCH_ENABLED: bool = False
+    DISPATCH_RADIUS_KM: float = 50
+    DISPATCH_CANDIDATES: int = 25
+    DISPATCH_MAX_ACTIVE_TASKS: int = 3
+    DISPATCH_LOAD_PENALTY_KM: float = 5
+    
+    # Live location streaming
+    LOCATION_FLUSH_INTERVAL_SECONDS: float = 5
+    
+    # Dashboard counters are reconciled against the database this often
+    DASHBOARD_RECONCILE_INTERVAL_SECONDS: float = 60
+    
+    # Region rooms for geofenced SOS/incident fan-out
+    GEO_ROOM_CELL_DEGREES: float = 0.5
+    GEO_ALERT_RADIUS_KM: float = 50
+    
+    # Duplicate SOS detection at ingest
+    SOS_DEDUP_ENABLED: bool = True
+    SOS_DEDUP_WINDOW_SECONDS: float = 300
+    SOS_DEDUP_RADIUS_KM: float = 0.2
+    
+    # Largest batch accepted by POST /api/ingest/
+    BULK_INGEST_MAX_RECORDS: int = 5000
+    
+    # Closed items older than this move to the *_archive tables
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_AFTER_DAYS: float = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_INTERVAL_SECONDS: float = 3600
+    
+    # Socket.IO scale-out: workers sharing a message queue (e.g. redis://localhost:6379/0) reach every socket
+    SOCKETIO_MESSAGE_QUEUE: str = ""  # Single process when empty
+    SOCKETIO_CHANNEL: str = "resq-socketio"
+    PRESENCE_TTL_SECONDS: float = 60  # Sockets of a crashed worker drop out of presence after this
+    
+    # Tick batching of task_updated / user_location_updated / volunteer_status_changed
+    SOCKET_BATCHING_ENABLED: bool = True
+    SOCKET_BATCH_WINDOW_MS: float = 150
+    SOCKET_BATCH_ROOM_WINDOWS: str = "admin=250,user:*=100"  # room=ms or prefix*=ms; 0 sends immediately
+    
+    # Structured logging (written by a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    SOCKETIO_LOG_LEVEL: str = "WARNING"  # python-socketio / python-engineio internals
+    LOG_SAMPLE_RATES: str = "user_location_updated=0.01,task_updated=0.1,http_request=0.1"  # event=fraction kept
+    LOG_REDACT_FIELDS: str = (
+        "password,hashed_password,token,access_token,refresh_token,"
+        "email,phone,address,message,content,description,latitude,longitude"
+    )
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
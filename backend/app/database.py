@@ -1,14 +1,117 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
 from app.config import settings
 
-# Create database engine
-engine = create_engine(settings.DATABASE_URL)
+
+class PoolMetrics:
+    """Counters for connection checkout waits and timeouts"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_total / waits * 1000, 3) if waits else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+            }
+
+
+class CheckoutTiming:
+    """Pool mixin that records how long each checkout waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(CheckoutTiming, QueuePool):
+    """QueuePool for the sync engines, with checkout wait metrics"""
+
+
+class InstrumentedAsyncQueuePool(CheckoutTiming, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool for the event-loop engine, with checkout wait metrics"""
+
+
+def engine_options(url: str, poolclass=InstrumentedQueuePool, share: float = 1.0) -> dict:
+    """Pool settings for an engine URL, sized to `share` of the pool budget (in-memory SQLite keeps its own pool)"""
+    if url.startswith("sqlite") and (":memory:" in url or url.split("://")[1] in ("", "/")):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": max(1, round(settings.DB_POOL_SIZE * share)),
+        "max_overflow": round(settings.DB_MAX_OVERFLOW * share),
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+# Create database engine (the primary's pool budget is split with the async engine below)
+engine = create_engine(
+    settings.DATABASE_URL,
+    **engine_options(settings.DATABASE_URL, share=1 - settings.DB_ASYNC_POOL_SHARE)
+)
 
 # Create session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver (asyncpg / aiosqlite)"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+# Async engine for handlers that run on the event loop
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    **engine_options(settings.DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, share=settings.DB_ASYNC_POOL_SHARE)
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
@@ -20,3 +123,123 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async database session dependency"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class Replica:
+    """A read-only engine plus its last measured replication lag"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, **engine_options(url))
+        self.sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.lag: Optional[float] = None
+        self.healthy = False
+
+    def measure_lag(self) -> float:
+        """Seconds behind the primary (0 for databases that are not streaming replicas)"""
+        with self.engine.connect() as conn:
+            if self.engine.dialect.name == "postgresql":
+                lag = conn.execute(text(
+                    "SELECT CASE WHEN pg_is_in_recovery() "
+                    "THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) ELSE 0 END"
+                )).scalar()
+                return float(lag or 0)
+            conn.execute(text("SELECT 1"))
+            return 0.0
+
+
+class ReplicaSet:
+    """Read replicas from DATABASE_REPLICA_URLS, used round-robin while their lag is acceptable.
+
+    Lag is refreshed by check(); replicas that are unreachable or more than
+    REPLICA_MAX_LAG_SECONDS behind are skipped, and reads fall back to the
+    primary when none qualify.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._cycle = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+
+    def check(self) -> int:
+        """Re-measure every replica's lag; returns how many are usable"""
+        for replica in self.replicas:
+            try:
+                replica.lag = replica.measure_lag()
+                replica.healthy = replica.lag <= settings.REPLICA_MAX_LAG_SECONDS
+            except Exception:
+                replica.lag = None
+                replica.healthy = False
+        return sum(replica.healthy for replica in self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self._cycle)
+                if replica.healthy:
+                    return replica
+        return None
+
+    def status(self) -> List[dict]:
+        return [
+            {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag,
+            }
+            for replica in self.replicas
+        ]
+
+
+read_replicas = ReplicaSet([url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()])
+
+
+def get_read_db():
+    """Database session dependency for read-only routes (a replica when one is usable)"""
+    replica = read_replicas.choose()
+    db = replica.sessionmaker() if replica else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def check_replicas_periodically(interval: float):
+    """Background loop refreshing replica lag every `interval` seconds"""
+    while True:
+        await asyncio.to_thread(read_replicas.check)
+        await asyncio.sleep(interval)
+
+
+def pool_snapshot(pool: Pool) -> dict:
+    """Occupancy plus checkout wait metrics of one connection pool"""
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, CheckoutTiming):
+        stats.update(pool.metrics.snapshot())
+    return stats
+
+
+def pool_stats() -> dict:
+    """Both primary pools (sync routes, event-loop handlers) plus replica status"""
+    stats = {
+        "sync": pool_snapshot(engine.pool),
+        "async": pool_snapshot(async_engine.sync_engine.pool),
+    }
+    if read_replicas.replicas:
+        stats["replicas"] = read_replicas.status()
+    return stats
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterable, Optional, Tuple
+from sqlalchemy import Update, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.geo import GridIndex
+from app.indexbus import index_bus
+from app.models import SOSRequest, TaskStatus
+
+# Statuses after which an SOS no longer absorbs new duplicates
+CLOSED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.REJECTED, TaskStatus.CANCELLED)
+
+
+class SOSDeduplicator:
+    """Sliding-window spatial index of recent primary SOS requests.
+
+    A new SOS that lands within SOS_DEDUP_RADIUS_KM of an open primary created
+    in the last SOS_DEDUP_WINDOW_SECONDS is linked to it instead of becoming
+    independent work.
+    """
+
+    def __init__(self):
+        self.index = GridIndex(cell_size=0.01)
+        self._expiry: Deque[Tuple[float, int]] = deque()
+        self._registered_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        cutoff = now - settings.SOS_DEDUP_WINDOW_SECONDS
+        with self._lock:
+            while self._expiry and self._expiry[0][0] < cutoff:
+                registered_at, sos_id = self._expiry.popleft()
+                # Entries left behind by a discard or a later re-registration must not evict the current one
+                if self._registered_at.get(sos_id) != registered_at:
+                    continue
+                del self._registered_at[sos_id]
+                self.index.remove(sos_id)
+
+    def register(self, sos_id: int, latitude: float, longitude: float, created_at: Optional[float] = None):
+        """Make an SOS available as a merge target for the current window"""
+        created_at = created_at or time.time()
+        with self._lock:
+            self._expiry.append((created_at, sos_id))
+            self._registered_at[sos_id] = created_at
+        self.index.insert(sos_id, latitude, longitude)
+
+    def discard(self, sos_id: int):
+        with self._lock:
+            self._registered_at.pop(sos_id, None)
+        self.index.remove(sos_id)
+
+    def candidates(self, latitude: float, longitude: float) -> Iterable[int]:
+        """Recent primary SOS ids near a coordinate, nearest first"""
+        self._expire(time.time())
+        matches = self.index.within_radius(latitude, longitude, settings.SOS_DEDUP_RADIUS_KM)
+        return [sos_id for sos_id, _ in matches]
+
+    async def find_primary(self, db: AsyncSession, latitude: float, longitude: float) -> Optional[SOSRequest]:
+        """Return the open SOS a new request at this location should be linked to"""
+        for sos_id in self.candidates(latitude, longitude):
+            primary = await db.scalar(select(SOSRequest).where(SOSRequest.id == sos_id))
+            if primary is None or primary.status in CLOSED_STATUSES:
+                self.discard(sos_id)
+                continue
+            return primary
+        return None
+
+    def rebuild(self, db: Session) -> int:
+        """Load primaries created inside the current window"""
+        self.index.clear()
+        with self._lock:
+            self._expiry.clear()
+            self._registered_at.clear()
+
+        since = datetime.utcnow() - timedelta(seconds=settings.SOS_DEDUP_WINDOW_SECONDS)
+        recent = db.query(
+            SOSRequest.id, SOSRequest.latitude, SOSRequest.longitude, SOSRequest.created_at, SOSRequest.status
+        ).filter(
+            SOSRequest.duplicate_of_id.is_(None),
+            SOSRequest.created_at >= since,
+            SOSRequest.status.notin_(CLOSED_STATUSES)
+        ).order_by(SOSRequest.created_at)
+        for sos_id, latitude, longitude, created_at, sos_status in recent:
+            registered_at = window_timestamp(created_at, sos_status)
+            if registered_at is not None:
+                self.register(sos_id, latitude, longitude, registered_at)
+
+        return len(self.index)
+
+
+sos_deduplicator = SOSDeduplicator()
+index_bus.handler("dedup_register")(sos_deduplicator.register)
+index_bus.handler("dedup_discard")(sos_deduplicator.discard)
+
+
+def window_timestamp(created_at: datetime, status: TaskStatus) -> Optional[float]:
+    """Epoch creation time of a stored SOS that can still absorb duplicates, None otherwise"""
+    age = (datetime.utcnow() - created_at).total_seconds()
+    if status in CLOSED_STATUSES or age > settings.SOS_DEDUP_WINDOW_SECONDS:
+        return None
+    return time.time() - age
+
+
+def register_primary(sos_id: int, latitude: float, longitude: float, created_at: Optional[float] = None):
+    """Make a primary SOS a merge target on every worker"""
+    created_at = created_at or time.time()
+    sos_deduplicator.register(sos_id, latitude, longitude, created_at)
+    index_bus.publish("dedup_register", sos_id, latitude, longitude, created_at)
+
+
+def discard_primary(sos_id: int):
+    """Stop merging new requests into an SOS on every worker"""
+    sos_deduplicator.discard(sos_id)
+    index_bus.publish("dedup_discard", sos_id)
+
+
+def linked_status_update(primary_ids: Iterable[int], status: TaskStatus) -> Update:
+    """UPDATE copying a primary SOS status onto every request linked to it"""
+    return (
+        update(SOSRequest)
+        .where(SOSRequest.duplicate_of_id.in_(list(primary_ids)))
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
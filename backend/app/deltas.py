@@ -0,0 +1,27 @@
+from typing import Any, Dict
+
+
+def changed_fields(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of `after` that differ from `before`; nested objects shrink to their changed fields plus id"""
+    changes = {}
+    for key, value in after.items():
+        previous = before.get(key)
+        if value == previous:
+            continue
+        same_object = isinstance(value, dict) and isinstance(previous, dict) and value.get("id") == previous.get("id")
+        if same_object and "id" in value:
+            changes[key] = {"id": value["id"], **changed_fields(previous, value)}
+        else:
+            changes[key] = value
+    return changes
+
+
+def versioned_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Socket payload for an update of a versioned entity, from its serialized state before and after.
+
+    Clients holding `base_version` apply the fields on top of their copy;
+    any other version means they missed an update and should refetch.
+    """
+    changes = changed_fields(before, after)
+    changes.pop("version", None)
+    return {"id": after["id"], "version": after["version"], "base_version": before["version"], **changes}
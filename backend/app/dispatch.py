@@ -0,0 +1,236 @@
+import threading
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.geo import GridIndex, distance_matrix, sync_item
+from app.indexbus import index_bus
+from app.locations import LocationRecord, live_locations
+from app.dedup import linked_status_update
+from app.loaders import TASK_LOAD_OPTIONS
+from app.models import User, UserRole, VolunteerStatus, SOSRequest, Task, TaskStatus
+from app.schemas import TaskResponse
+from app.socketio_server import emit_task_assigned
+
+# Task statuses that keep a volunteer busy
+ACTIVE_TASK_STATUSES = (
+    TaskStatus.ASSIGNED,
+    TaskStatus.ACCEPTED,
+    TaskStatus.RESPONDING,
+    TaskStatus.ON_SITE,
+)
+
+
+class VolunteerRegistry:
+    """Online volunteer positions plus their current active-task load"""
+
+    def __init__(self):
+        self.index = GridIndex()
+        self._task_owner: Dict[Hashable, int] = {}
+        self._load: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def sync_volunteer(self, user: User):
+        """Index a volunteer while ONLINE with a known location, drop them otherwise, on every worker"""
+        position = self._dispatch_position(user)
+        self._place_volunteer(user.id, position)
+        index_bus.publish("volunteer_place", user.id, position)
+
+    def _dispatch_position(self, user: User) -> Optional[Tuple[float, float]]:
+        latitude, longitude = user.latitude, user.longitude
+        live = live_locations.get(user.id)
+        if live is not None:
+            latitude, longitude = live.latitude, live.longitude
+
+        if (
+            user.role == UserRole.VOLUNTEER
+            and user.volunteer_status == VolunteerStatus.ONLINE
+            and latitude is not None
+            and longitude is not None
+        ):
+            return latitude, longitude
+        return None
+
+    def _place_volunteer(self, user_id: int, position: Optional[Tuple[float, float]]):
+        if position is None:
+            self.index.remove(user_id)
+        else:
+            self.index.insert(user_id, *position)
+
+    def move_volunteer(self, record: LocationRecord):
+        """Follow a streamed position update for an indexed volunteer (this worker only)"""
+        if record.user_id in self.index:
+            self.index.insert(record.user_id, record.latitude, record.longitude)
+
+    def remove_volunteer(self, user_id: int):
+        self._place_volunteer(user_id, None)
+        index_bus.publish("volunteer_place", user_id, None)
+
+    def sync_task(self, task_id: Hashable, volunteer_id: Optional[int], status: TaskStatus):
+        """Track which volunteers are carrying which active tasks, on every worker"""
+        self._sync_task(task_id, volunteer_id, status)
+        index_bus.publish("volunteer_task", task_id, volunteer_id, status.value)
+
+    def _sync_task(self, task_id: Hashable, volunteer_id: Optional[int], status: TaskStatus):
+        with self._lock:
+            previous = self._task_owner.pop(task_id, None)
+            if previous is not None:
+                self._load[previous] -= 1
+                if not self._load[previous]:
+                    del self._load[previous]
+
+            if volunteer_id is not None and status in ACTIVE_TASK_STATUSES:
+                self._task_owner[task_id] = volunteer_id
+                self._load[volunteer_id] = self._load.get(volunteer_id, 0) + 1
+
+    def load(self, volunteer_id: int) -> int:
+        return self._load.get(volunteer_id, 0)
+
+    def best_volunteer(self, latitude: float, longitude: float) -> Optional[Tuple[int, float]]:
+        """Pick the volunteer with the lowest distance + load score.
+
+        Only the DISPATCH_CANDIDATES nearest volunteers with a free slot are
+        scored, so the cost does not grow with the number of volunteers online;
+        volunteers at DISPATCH_MAX_ACTIVE_TASKS are skipped during the search.
+        """
+        candidates = self.index.nearest(
+            latitude, longitude,
+            settings.DISPATCH_CANDIDATES,
+            max_radius_km=settings.DISPATCH_RADIUS_KM,
+            where=lambda volunteer_id: self.load(volunteer_id) < settings.DISPATCH_MAX_ACTIVE_TASKS
+        )
+
+        best = None
+        best_score = None
+        for volunteer_id, distance in candidates:
+            load = self.load(volunteer_id)
+            if load >= settings.DISPATCH_MAX_ACTIVE_TASKS:
+                continue
+            score = distance + load * settings.DISPATCH_LOAD_PENALTY_KM
+            if best_score is None or score < best_score:
+                best, best_score = (volunteer_id, distance), score
+
+        return best
+
+    def rebuild(self, db: Session) -> int:
+        """Load online volunteers and active task assignments from the database"""
+        self.index.clear()
+        with self._lock:
+            self._task_owner.clear()
+            self._load.clear()
+
+        volunteers = db.query(User).filter(
+            User.role == UserRole.VOLUNTEER,
+            User.volunteer_status == VolunteerStatus.ONLINE
+        )
+        for volunteer in volunteers:
+            self._place_volunteer(volunteer.id, self._dispatch_position(volunteer))
+
+        tasks = db.query(Task.id, Task.volunteer_id, Task.status).filter(
+            Task.status.in_(ACTIVE_TASK_STATUSES)
+        )
+        for task_id, volunteer_id, task_status in tasks:
+            self._sync_task(task_id, volunteer_id, task_status)
+
+        return len(self.index)
+
+
+volunteer_registry = VolunteerRegistry()
+index_bus.handler("volunteer_place")(volunteer_registry._place_volunteer)
+
+
+@index_bus.handler("volunteer_task")
+def _sync_task_from_bus(task_id, volunteer_id: Optional[int], status: str):
+    if isinstance(task_id, list):
+        task_id = tuple(task_id)  # Dispatch reservations arrive as JSON arrays
+    volunteer_registry._sync_task(task_id, volunteer_id, TaskStatus(status))
+
+
+async def auto_dispatch(db: AsyncSession, sos: SOSRequest) -> Optional[Task]:
+    """Assign a pending SOS request to the best available volunteer"""
+    match = volunteer_registry.best_volunteer(sos.latitude, sos.longitude)
+    if match is None:
+        return None
+
+    # Hold the slot while the commit awaits so concurrent dispatches see the load
+    volunteer_id, distance = match
+    reservation = ("dispatch", sos.id)
+    volunteer_registry.sync_task(reservation, volunteer_id, TaskStatus.ASSIGNED)
+
+    task = Task(
+        volunteer_id=volunteer_id,
+        sos_request_id=sos.id,
+        status=TaskStatus.ASSIGNED,
+        notes=f"Auto-dispatched ({distance:.2f} km away)"
+    )
+    sos.status = TaskStatus.ASSIGNED
+
+    try:
+        await db.execute(linked_status_update([sos.id], sos.status))
+        db.add(task)
+        await db.commit()
+    finally:
+        volunteer_registry.sync_task(reservation, None, TaskStatus.CANCELLED)
+
+    volunteer_registry.sync_task(task.id, task.volunteer_id, task.status)
+    sync_item("sos", sos.id, sos.latitude, sos.longitude, sos.status, "sos")
+
+    task = await db.scalar(
+        select(Task).options(*TASK_LOAD_OPTIONS).where(Task.id == task.id)
+        .execution_options(populate_existing=True)
+    )
+    task_response = TaskResponse.model_validate(task)
+    await emit_task_assigned(task_response.model_dump(mode='json'), task.volunteer_id)
+
+    return task
+
+
+def solve_assignment(
+    items: np.ndarray,
+    volunteers: np.ndarray,
+    loads: np.ndarray
+) -> List[Tuple[int, int, float]]:
+    """Globally optimal item -> volunteer matching on a distance matrix.
+
+    `items` and `volunteers` are (n, 2) arrays of latitude/longitude and
+    `loads` holds each volunteer's current active-task count. Every volunteer
+    gets one column per free slot up to DISPATCH_MAX_ACTIVE_TASKS, each slot
+    costing DISPATCH_LOAD_PENALTY_KM more than the previous one, and the
+    resulting min-cost assignment is solved with the Hungarian method.
+    Pairs further apart than DISPATCH_RADIUS_KM are never matched.
+
+    Returns (item_index, volunteer_index, distance_km) triples.
+    """
+    if not len(items) or not len(volunteers):
+        return []
+
+    distances = distance_matrix(items[:, 0], items[:, 1], volunteers[:, 0], volunteers[:, 1])
+    reachable = distances <= settings.DISPATCH_RADIUS_KM
+
+    # Drop rows and columns that cannot take part in any match
+    item_ids = np.flatnonzero(reachable.any(axis=1))
+    capacities = np.clip(settings.DISPATCH_MAX_ACTIVE_TASKS - loads, 0, None)
+    volunteer_ids = np.flatnonzero(reachable.any(axis=0) & (capacities > 0))
+    if not len(item_ids) or not len(volunteer_ids):
+        return []
+
+    distances = distances[np.ix_(item_ids, volunteer_ids)]
+    capacities = np.minimum(capacities[volunteer_ids], len(item_ids))
+
+    slot_owner = np.repeat(np.arange(len(volunteer_ids)), capacities)
+    slot_rank = np.arange(len(slot_owner)) - np.repeat(np.cumsum(capacities) - capacities, capacities)
+    slot_distances = distances[:, slot_owner]
+
+    unreachable = settings.DISPATCH_RADIUS_KM * 1000 + 1
+    cost = slot_distances + (loads[volunteer_ids][slot_owner] + slot_rank) * settings.DISPATCH_LOAD_PENALTY_KM
+    cost[slot_distances > settings.DISPATCH_RADIUS_KM] = unreachable
+
+    rows, cols = linear_sum_assignment(cost)
+    return [
+        (int(item_ids[row]), int(volunteer_ids[slot_owner[col]]), float(slot_distances[row, col]))
+        for row, col in zip(rows, cols)
+        if cost[row, col] < unreachable
+    ]
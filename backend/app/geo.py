@@ -0,0 +1,243 @@
+import math
+import threading
+import numpy as np
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.models import SOSRequest, IncidentReport, TaskStatus
+from app.clusters import map_clusters
+from app.indexbus import index_bus
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 111.32
+
+
+def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate distance between two coordinates in km using Haversine formula"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+    return EARTH_RADIUS_KM * c
+
+
+def calculate_distances(latitude: float, longitude: float, latitudes, longitudes) -> np.ndarray:
+    """Vectorized Haversine distance in km from one coordinate to arrays of coordinates"""
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    delta_lat = lat2 - lat1
+    delta_lon = np.radians(np.asarray(longitudes, dtype=np.float64) - longitude)
+
+    a = np.sin(delta_lat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(delta_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_matrix(latitudes_a, longitudes_a, latitudes_b, longitudes_b) -> np.ndarray:
+    """Pairwise Haversine distances in km, shaped (len(a), len(b))"""
+    lat_a = np.radians(np.asarray(latitudes_a, dtype=np.float64))[:, None]
+    lon_a = np.radians(np.asarray(longitudes_a, dtype=np.float64))[:, None]
+    lat_b = np.radians(np.asarray(latitudes_b, dtype=np.float64))[None, :]
+    lon_b = np.radians(np.asarray(longitudes_b, dtype=np.float64))[None, :]
+
+    a = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * np.cos(lat_b) * np.sin((lon_b - lon_a) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GridIndex:
+    """Uniform lat/lon grid index over points keyed by an arbitrary hashable key.
+
+    Points are bucketed into cells of `cell_size` degrees, so radius and
+    k-nearest queries only touch the cells around the query point instead
+    of every indexed point.
+    """
+
+    def __init__(self, cell_size: float = 0.1):
+        self.cell_size = cell_size
+        self._columns = int(round(360 / cell_size))
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._points: Dict[Hashable, Tuple[float, float, Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def cell_for(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Return the (row, column) cell containing a coordinate"""
+        row = math.floor(latitude / self.cell_size)
+        col = math.floor(longitude / self.cell_size) % self._columns
+        return row, col
+
+    def insert(self, key: Hashable, latitude: float, longitude: float):
+        """Add a point, or move it if the key is already indexed"""
+        cell = self.cell_for(latitude, longitude)
+        with self._lock:
+            self._discard(key)
+            self._points[key] = (latitude, longitude, cell)
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: Hashable):
+        """Remove a point if present"""
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._points.clear()
+
+    def _discard(self, key: Hashable):
+        entry = self._points.pop(key, None)
+        if entry is None:
+            return
+        bucket = self._cells.get(entry[2])
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[entry[2]]
+
+    def _cell_width_km(self, latitude: float, lat_offset: float) -> float:
+        """Narrowest east-west cell width within lat_offset degrees of a latitude"""
+        max_lat = min(89.9, abs(latitude) + lat_offset)
+        return max(self.cell_size * KM_PER_DEGREE * math.cos(math.radians(max_lat)), 1e-6)
+
+    def cells_within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[int, int]]:
+        """Return every cell that may contain points within radius_km of a coordinate"""
+        lat_span = radius_km / KM_PER_DEGREE
+        max_lat = min(89.9, abs(latitude) + lat_span)
+        lon_span = min(180.0, radius_km / (KM_PER_DEGREE * math.cos(math.radians(max_lat))))
+
+        row_min = math.floor((latitude - lat_span) / self.cell_size)
+        row_max = math.floor((latitude + lat_span) / self.cell_size)
+        col_min = math.floor((longitude - lon_span) / self.cell_size)
+        col_max = math.floor((longitude + lon_span) / self.cell_size)
+
+        cols = {col % self._columns for col in range(col_min, col_max + 1)}
+        return [(row, col) for row in range(row_min, row_max + 1) for col in cols]
+
+    def _measure(self, latitude: float, longitude: float, keys: List[Hashable]) -> np.ndarray:
+        """Distances in km from a coordinate to the given indexed keys"""
+        coords = np.array([self._points[key][:2] for key in keys], dtype=np.float64).reshape(-1, 2)
+        return calculate_distances(latitude, longitude, coords[:, 0], coords[:, 1])
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[Hashable, float]]:
+        """Return (key, distance_km) for all points within radius_km, nearest first"""
+        with self._lock:
+            keys = [
+                key
+                for cell in self.cells_within(latitude, longitude, radius_km)
+                for key in self._cells.get(cell, ())
+            ]
+            distances = self._measure(latitude, longitude, keys)
+
+        order = np.argsort(distances, kind="stable")
+        order = order[distances[order] <= radius_km]
+        return [(keys[i], float(distances[i])) for i in order]
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                max_radius_km: Optional[float] = None,
+                where: Optional[Callable[[Hashable], bool]] = None) -> List[Tuple[Hashable, float]]:
+        """Return up to k (key, distance_km) pairs ordered by distance.
+
+        Searches outward ring by ring and stops once no unvisited cell can hold
+        a point closer than the current k-th best. Keys rejected by `where`
+        are skipped, so the search keeps widening past them.
+        """
+        if k <= 0:
+            return []
+
+        center_row, center_col = self.cell_for(latitude, longitude)
+        max_ring = self._columns // 2
+        if max_radius_km is not None:
+            radius_cell_km = self._cell_width_km(latitude, max_radius_km / KM_PER_DEGREE)
+            max_ring = min(max_ring, int(max_radius_km / radius_cell_km) + 1)
+
+        keys: List[Hashable] = []
+        distances = np.empty(0)
+        visited = 0
+        with self._lock:
+            if not self._points:
+                return []
+
+            for ring in range(max_ring + 1):
+                ring_keys = []
+                for row in range(center_row - ring, center_row + ring + 1):
+                    edge_row = row in (center_row - ring, center_row + ring)
+                    step = 1 if edge_row else 2 * ring
+                    for col in range(center_col - ring, center_col + ring + 1, max(step, 1)):
+                        ring_keys.extend(self._cells.get((row, col % self._columns), ()))
+
+                visited += len(ring_keys)
+                if where is not None:
+                    ring_keys = [key for key in ring_keys if where(key)]
+                if ring_keys:
+                    keys.extend(ring_keys)
+                    distances = np.concatenate([distances, self._measure(latitude, longitude, ring_keys)])
+
+                if len(keys) >= k:
+                    kth = np.partition(distances, k - 1)[k - 1]
+                    # Anything outside this ring is at least `ring` cells away
+                    bound = ring * self._cell_width_km(latitude, (ring + 1) * self.cell_size)
+                    if kth <= bound:
+                        break
+                if visited >= len(self._points):
+                    break
+
+        order = np.argsort(distances, kind="stable")
+        if max_radius_km is not None:
+            order = order[distances[order] <= max_radius_km]
+        found = [(keys[i], float(distances[i])) for i in order[:k]]
+        return found
+
+
+# Pending SOS requests and incident reports, keyed by ("sos" | "incident", id)
+pending_index = GridIndex()
+
+
+def sync_item(kind: str, item_id: int, latitude: float, longitude: float, status: TaskStatus,
+              category: Optional[str] = None):
+    """Keep the pending index and map clusters in step with an SOS/incident, on every worker"""
+    _sync_item(kind, item_id, latitude, longitude, status.value, category)
+    index_bus.publish("sync_item", kind, item_id, latitude, longitude, status.value, category)
+
+
+def forget_item(kind: str, item_id: int):
+    """Drop a deleted SOS/incident from the pending index and map clusters, on every worker"""
+    _forget_item(kind, item_id)
+    index_bus.publish("forget_item", kind, item_id)
+
+
+@index_bus.handler("sync_item")
+def _sync_item(kind: str, item_id: int, latitude: float, longitude: float, status: str,
+               category: Optional[str]):
+    if status == TaskStatus.PENDING.value:
+        pending_index.insert((kind, item_id), latitude, longitude)
+    else:
+        pending_index.remove((kind, item_id))
+    map_clusters.upsert((kind, item_id), latitude, longitude, status, category)
+
+
+@index_bus.handler("forget_item")
+def _forget_item(kind: str, item_id: int):
+    pending_index.remove((kind, item_id))
+    map_clusters.remove((kind, item_id))
+
+
+def rebuild_pending_index(db: Session) -> int:
+    """Load all pending SOS requests and incidents into the index"""
+    pending_index.clear()
+    for kind, model in (("sos", SOSRequest), ("incident", IncidentReport)):
+        rows = db.query(model.id, model.latitude, model.longitude).filter(
+            model.status == TaskStatus.PENDING
+        )
+        if model is SOSRequest:
+            rows = rows.filter(SOSRequest.duplicate_of_id.is_(None))
+        for item_id, latitude, longitude in rows:
+            pending_index.insert((kind, item_id), latitude, longitude)
+
+    return len(pending_index)
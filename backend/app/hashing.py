@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from app.config import settings
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    """Hash a password (runs inside the worker processes)"""
+    return pwd_context.hash(password)
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash (runs inside the worker processes)"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashMetrics:
+    """Counters for queued, completed and rejected password operations"""
+
+    def __init__(self):
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._lock = threading.Lock()
+
+    def admit(self, limit: int) -> bool:
+        """Reserve a queue slot, or count a rejection when the queue is full"""
+        with self._lock:
+            if self.pending >= limit:
+                self.rejected += 1
+                return False
+            self.pending += 1
+            return True
+
+    def release(self, latency: float):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "latency_ms_avg": round(self.latency_total / self.completed * 1000, 3) if self.completed else 0.0,
+                "latency_ms_max": round(self.latency_max * 1000, 3),
+            }
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool so it never blocks request threads.
+
+    At most PASSWORD_HASH_QUEUE_LIMIT operations may be queued or running at
+    once; anything beyond that is rejected immediately with a 503 instead of
+    piling up behind a login storm.
+    """
+
+    def __init__(self):
+        self.metrics = HashMetrics()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _run(self, func, *args):
+        if not self.metrics.admit(settings.PASSWORD_HASH_QUEUE_LIMIT):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry shortly",
+                headers={"Retry-After": "1"}
+            )
+
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+        finally:
+            self.metrics.release(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(check_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "queue_limit": settings.PASSWORD_HASH_QUEUE_LIMIT,
+            **self.metrics.snapshot(),
+        }
+
+
+password_hasher = PasswordHasher()
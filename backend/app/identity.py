@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.indexbus import index_bus
+from app.models import User, UserRole
+
+
+class UserIdentity:
+    """The authorization fields of a user, detached from any session"""
+
+    __slots__ = ("id", "role", "is_active")
+
+    def __init__(self, id: int, role: UserRole, is_active: bool):
+        self.id = id
+        self.role = role
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserIdentity":
+        return cls(user.id, user.role, user.is_active)
+
+
+class IdentityCache:
+    """Bounded LRU of UserIdentity by user id, each entry valid for AUTH_CACHE_TTL_SECONDS"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> Optional[UserIdentity]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, identity: UserIdentity):
+        if settings.AUTH_CACHE_MAX_ENTRIES <= 0:
+            return
+        with self._lock:
+            self._entries[identity.id] = (time.monotonic() + settings.AUTH_CACHE_TTL_SECONDS, identity)
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > settings.AUTH_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+index_bus.handler("identity_invalidate")(identity_cache.invalidate)
+
+_PENDING_KEY = "identity_cache_invalidations"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context):
+    """Remember users modified or deleted in this transaction"""
+    changed = [obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)]
+    if changed:
+        session.info.setdefault(_PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session):
+    """Evict cached identities once their changes are committed, on every worker"""
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        identity_cache.invalidate(user_id)
+        index_bus.publish("identity_invalidate", user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_users(session: Session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
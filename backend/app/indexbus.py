@@ -0,0 +1,93 @@
+import asyncio
+import json
+import uuid
+from typing import Callable, Dict, Optional
+from app.config import settings
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class IndexBus:
+    """Replays in-memory index updates on every worker sharing a Redis-protocol server.
+
+    Writers apply an update locally and `publish` it by name; every other
+    worker applies it through the function registered under that name. Each
+    update sets state (place a point, set a status), so replaying one that
+    a worker already loaded from the database is harmless. Without a URL
+    publishing does nothing and the indexes stay per process.
+    """
+
+    def __init__(self, url: str = "", channel: str = "resq-indexes"):
+        self.url = url
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex
+        self._handlers: Dict[str, Callable] = {}
+        self._redis = None
+        self._pubsub = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._outbox: Optional[asyncio.Queue] = None
+
+    def handler(self, name: str):
+        """Decorator registering the local apply function for an update"""
+        def register(apply: Callable) -> Callable:
+            self._handlers[name] = apply
+            return apply
+        return register
+
+    def publish(self, name: str, *args):
+        """Send an update to the other workers (callable from the event loop or route threads)"""
+        if self._outbox is None:
+            return
+        message = json.dumps({"worker": self.worker_id, "name": name, "args": args})
+        self._loop.call_soon_threadsafe(self._outbox.put_nowait, message)
+
+    async def start(self):
+        """Subscribe before the indexes are loaded, so no update is missed in between"""
+        if not self.url:
+            return
+        from redis import asyncio as aioredis
+
+        self._redis = aioredis.Redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._loop = asyncio.get_running_loop()
+        self._outbox = asyncio.Queue()
+
+    async def run(self):
+        """Publish this worker's updates and apply everyone else's until cancelled"""
+        if self._pubsub is None:
+            return
+        try:
+            await asyncio.gather(self._send(), self._receive())
+        finally:
+            self._outbox = None
+            await self._pubsub.aclose()
+            await self._redis.aclose()
+
+    async def _send(self):
+        while True:
+            message = await self._outbox.get()
+            try:
+                await self._redis.publish(self.channel, message)
+            except Exception:
+                logger.exception("Index update publish failed")
+
+    async def _receive(self):
+        async for message in self._pubsub.listen():
+            try:
+                update = json.loads(message["data"])
+                if update["worker"] != self.worker_id:
+                    self._handlers[update["name"]](*update["args"])
+            except Exception:
+                logger.exception("Index update failed")
+
+
+def create_index_bus(url: str, channel: str) -> IndexBus:
+    """Shared index updates when a Redis message queue is configured, per process otherwise"""
+    if url.split("://", 1)[0] in ("redis", "rediss"):
+        return IndexBus(url, channel)
+    return IndexBus()
+
+
+index_bus = create_index_bus(settings.SOCKETIO_MESSAGE_QUEUE, f"{settings.SOCKETIO_CHANNEL}:indexes")
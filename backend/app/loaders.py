@@ -0,0 +1,58 @@
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import (
+    Task, SOSRequest, IncidentReport, Message, Comment,
+    ArchivedTask, ArchivedSOSRequest, ArchivedIncidentReport, ArchivedMessage, ArchivedComment
+)
+
+# Relationships serialized by TaskResponse
+TASK_LOAD_OPTIONS = (
+    selectinload(Task.volunteer),
+    selectinload(Task.sos_request).selectinload(SOSRequest.citizen),
+    selectinload(Task.incident_report).selectinload(IncidentReport.citizen),
+)
+
+# Relationships serialized by SOSRequestResponse
+SOS_LOAD_OPTIONS = (
+    selectinload(SOSRequest.citizen),
+    selectinload(SOSRequest.tasks).options(*TASK_LOAD_OPTIONS),
+)
+
+# Relationships serialized by IncidentReportResponse
+INCIDENT_LOAD_OPTIONS = (
+    selectinload(IncidentReport.citizen),
+    selectinload(IncidentReport.tasks).options(*TASK_LOAD_OPTIONS),
+)
+
+# Many-to-one author rows join straight into the list query
+MESSAGE_LOAD_OPTIONS = (
+    joinedload(Message.sender),
+)
+
+COMMENT_LOAD_OPTIONS = (
+    joinedload(Comment.author),
+)
+
+# The same shapes read from the archive tables
+ARCHIVED_TASK_LOAD_OPTIONS = (
+    selectinload(ArchivedTask.volunteer),
+    selectinload(ArchivedTask.sos_request).selectinload(ArchivedSOSRequest.citizen),
+    selectinload(ArchivedTask.incident_report).selectinload(ArchivedIncidentReport.citizen),
+)
+
+ARCHIVED_SOS_LOAD_OPTIONS = (
+    selectinload(ArchivedSOSRequest.citizen),
+    selectinload(ArchivedSOSRequest.tasks).options(*ARCHIVED_TASK_LOAD_OPTIONS),
+)
+
+ARCHIVED_INCIDENT_LOAD_OPTIONS = (
+    selectinload(ArchivedIncidentReport.citizen),
+    selectinload(ArchivedIncidentReport.tasks).options(*ARCHIVED_TASK_LOAD_OPTIONS),
+)
+
+ARCHIVED_MESSAGE_LOAD_OPTIONS = (
+    joinedload(ArchivedMessage.sender),
+)
+
+ARCHIVED_COMMENT_LOAD_OPTIONS = (
+    joinedload(ArchivedComment.author),
+)
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import User
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class LocationRecord:
+    """Latest reported position of a single user"""
+
+    __slots__ = ("user_id", "latitude", "longitude", "address", "updated_at", "dirty")
+
+    def __init__(self, user_id: int, latitude: float, longitude: float, address: Optional[str] = None):
+        self.user_id = user_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.address = address
+        self.updated_at = time.time()
+        self.dirty = True
+
+    def to_dict(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "address": self.address,
+            "updated_at": self.updated_at,
+        }
+
+
+class LocationRegistry:
+    """In-memory latest-position store, written back to the users table in bulk"""
+
+    def __init__(self):
+        self._records: Dict[int, LocationRecord] = {}
+        self._listeners: List[Callable[[LocationRecord], None]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add_listener(self, listener: Callable[[LocationRecord], None]):
+        """Call listener(record) after every position update"""
+        self._listeners.append(listener)
+
+    def get(self, user_id: int) -> Optional[LocationRecord]:
+        return self._records.get(user_id)
+
+    def discard(self, user_id: int):
+        with self._lock:
+            self._records.pop(user_id, None)
+
+    def update(self, user_id: int, latitude: float, longitude: float,
+               address: Optional[str] = None) -> LocationRecord:
+        """Record a new position for a user"""
+        with self._lock:
+            record = self._records.get(user_id)
+            if record is None:
+                record = LocationRecord(user_id, latitude, longitude, address)
+                self._records[user_id] = record
+            else:
+                record.latitude = latitude
+                record.longitude = longitude
+                if address:
+                    record.address = address
+                record.updated_at = time.time()
+                record.dirty = True
+
+        for listener in self._listeners:
+            listener(record)
+        return record
+
+    def flush(self, db: Session) -> int:
+        """Write every changed position to users.latitude/longitude in one bulk UPDATE"""
+        with self._lock:
+            rows = []
+            for record in self._records.values():
+                if record.dirty:
+                    record.dirty = False
+                    row = {"user_id": record.user_id, "latitude": record.latitude, "longitude": record.longitude}
+                    if record.address:
+                        row["address"] = record.address
+                    rows.append(row)
+
+        if not rows:
+            return 0
+
+        try:
+            # Rows with and without an address need separate executemany batches. A Core UPDATE
+            # skips users deleted since their last report, where an ORM bulk update by primary key
+            # would raise StaleDataError and fail every later flush along with this one
+            users = User.__table__
+            statement = update(users).where(users.c.id == bindparam("user_id"))
+            for with_address in (True, False):
+                batch = [row for row in rows if ("address" in row) == with_address]
+                if batch:
+                    db.execute(statement, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for row in rows:
+                    record = self._records.get(row["user_id"])
+                    if record is not None:
+                        record.dirty = True
+            raise
+
+        return len(rows)
+
+
+live_locations = LocationRegistry()
+
+
+def flush_live_locations() -> int:
+    """Flush the live registry using a short-lived session"""
+    db = SessionLocal()
+    try:
+        return live_locations.flush(db)
+    finally:
+        db.close()
+
+
+async def flush_locations_periodically(interval: float):
+    """Background loop that writes streamed positions back every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(flush_live_locations)
+        except Exception:
+            logger.exception("Location flush failed")
@@ -0,0 +1,182 @@
+"""Structured, non-blocking application logging.
+
+Records are put on an in-memory queue by the calling thread and written by a
+background listener thread, so a slow stdout or log collector never stalls
+the event loop. Each `log_event` record carries an event name and a dict of
+fields; fields named in LOG_REDACT_FIELDS are masked when the record is
+written, and LOG_SAMPLE_RATES keeps only a fraction of chatty events below
+WARNING.
+
+    logger = get_logger(__name__)
+    log_event(logger, "task_updated", task_id=7, rooms=3)
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from typing import Dict, FrozenSet, Optional
+from app.config import settings
+
+REDACTED = "[redacted]"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """"event=rate,event=rate" -> {event: rate}"""
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            event, rate = item.split("=", 1)
+            rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+def redact(value, fields: FrozenSet[str]):
+    """Copy of a payload with sensitive keys masked, at any depth"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in fields else redact(item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a configured fraction of each event's records; warnings and errors always pass"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "event", None), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps the traceback apart from the message instead of formatting the record inline"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object (or key=value line) per record, with redacted fields"""
+
+    def __init__(self, json_lines: bool, redact_fields: FrozenSet[str]):
+        super().__init__()
+        self.json_lines = json_lines
+        self.redact_fields = redact_fields
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name}
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+        else:
+            entry["message"] = record.getMessage()
+        entry.update(redact(getattr(record, "fields", None) or {}, self.redact_fields))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+
+        if self.json_lines:
+            return json.dumps(entry, default=str)
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+        extras = " ".join(f"{key}={value}" for key, value in entry.items() if key not in ("ts", "level", "logger"))
+        return f"{stamp} {record.levelname:<7} {record.name} {extras}"
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """Log a named event with structured fields; a no-op when the level is disabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"event": event, "fields": fields})
+
+
+class RequestLogMiddleware:
+    """ASGI middleware logging one sampled `http_request` event per request, keyed by route name, not URL"""
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = get_logger("app.http")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.logger.isEnabledFor(logging.INFO):
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            endpoint = scope.get("endpoint")
+            log_event(
+                self.logger,
+                "http_request",
+                logging.WARNING if status_code >= 500 else logging.INFO,
+                method=scope["method"],
+                route=getattr(endpoint, "__name__", None),
+                status=status_code,
+                duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+
+
+def configure_logging():
+    """Route all logging through one queue drained by a background writer thread"""
+    global _listener
+    if _listener is not None:
+        return
+
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(StructuredFormatter(
+        json_lines=settings.LOG_FORMAT == "json",
+        redact_fields=frozenset(
+            field.strip().lower() for field in settings.LOG_REDACT_FIELDS.split(",") if field.strip()
+        ),
+    ))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = StructuredQueueHandler(records)
+    handler.addFilter(SamplingFilter(parse_sample_rates(settings.LOG_SAMPLE_RATES)))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name in ("socketio", "engineio"):
+        logging.getLogger(name).setLevel(settings.SOCKETIO_LOG_LEVEL.upper())
+
+    _listener = logging.handlers.QueueListener(records, writer, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
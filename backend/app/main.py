@@ -1,16 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
 from app.config import settings
-from app.database import engine, Base
-from app.routes import auth, users, sos, incidents, tasks, messages, comments, dashboard
-from app.socketio_server import sio
+from app.database import check_replicas_periodically
+from app.routes import auth, users, sos, incidents, tasks, messages, comments, dashboard, maps, system, ingest
+from app.socketio_server import sio, presence, event_batcher
 from app.models import User, UserRole
 from app.auth import get_password_hash
+from app.geo import rebuild_pending_index
+from app.clusters import map_clusters
+from app.dedup import sos_deduplicator
+from app.dispatch import volunteer_registry
+from app.locations import live_locations, flush_live_locations, flush_locations_periodically
+from app.hashing import password_hasher
+from app.tokens import load_revocations, save_revocations
+from app.pagination import NEXT_CURSOR_HEADER
+from app.stats import dashboard_counters, reconcile_counters_periodically
+from app.archive import archive_periodically
+from app.migrations import migrate
+from app.presence import heartbeat_periodically
+from app.indexbus import index_bus
+from app.logs import RequestLogMiddleware, configure_logging, get_logger, shutdown_logging
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+configure_logging()
+logger = get_logger(__name__)
+
+# Bring the schema up to date
+applied_migrations = migrate()
+if applied_migrations:
+    logger.info("Applied schema migrations: %s", applied_migrations)
 
 # Create FastAPI app
 app = FastAPI(
@@ -26,7 +48,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+app.add_middleware(RequestLogMiddleware)
+
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    """A versioned row changed since this request read it; the client reloads and retries"""
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "Record was updated concurrently, reload it and retry"}
+    )
 
 # Include routers
 app.include_router(auth.router, prefix="/api")
@@ -37,12 +70,18 @@ app.include_router(tasks.router, prefix="/api")
 app.include_router(messages.router, prefix="/api")
 app.include_router(comments.router, prefix="/api")
 app.include_router(dashboard.router, prefix="/api")
+app.include_router(maps.router, prefix="/api")
+app.include_router(system.router, prefix="/api")
+app.include_router(ingest.router, prefix="/api")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize app on startup"""
-    print("Starting RESQ API...")
+    logger.info("Starting RESQ API...")
+    
+    # Listen for other workers' index updates before loading the indexes
+    await index_bus.start()
     
     # Create default admin user if not exists
     from app.database import SessionLocal
@@ -60,13 +99,68 @@ async def startup_event():
             )
             db.add(admin_user)
             db.commit()
-            print(f"Default admin user created: {settings.ADMIN_EMAIL}")
+            logger.info("Default admin user created")
         else:
-            print(f"Admin user already exists: {settings.ADMIN_EMAIL}")
+            logger.info("Admin user already exists")
+        
+        indexed = rebuild_pending_index(db)
+        logger.info("Indexed %d pending SOS requests and incidents", indexed)
+        
+        clustered = map_clusters.rebuild(db)
+        logger.info("Clustered %d SOS requests and incidents for the map", clustered)
+        
+        recent = sos_deduplicator.rebuild(db)
+        logger.info("Tracking %d recent SOS requests for duplicate detection", recent)
+        
+        online = volunteer_registry.rebuild(db)
+        logger.info("Indexed %d online volunteers for dispatch", online)
+        
+        counts = dashboard_counters.reconcile(db)
+        logger.info("Loaded dashboard counters: %s", counts)
     finally:
         db.close()
     
-    print("RESQ API started successfully!")
+    revoked = load_revocations()
+    logger.info("Loaded %d revoked refresh tokens", revoked)
+    
+    # Keep the dispatch index following streamed volunteer positions
+    live_locations.add_listener(volunteer_registry.move_volunteer)
+    app.state.location_flush_task = asyncio.create_task(
+        flush_locations_periodically(settings.LOCATION_FLUSH_INTERVAL_SECONDS)
+    )
+    app.state.counter_reconcile_task = asyncio.create_task(
+        reconcile_counters_periodically(settings.DASHBOARD_RECONCILE_INTERVAL_SECONDS)
+    )
+    app.state.replica_check_task = asyncio.create_task(
+        check_replicas_periodically(settings.REPLICA_CHECK_INTERVAL_SECONDS)
+    )
+    if settings.ARCHIVE_ENABLED:
+        app.state.archive_task = asyncio.create_task(archive_periodically(settings.ARCHIVE_INTERVAL_SECONDS))
+    app.state.presence_heartbeat_task = asyncio.create_task(
+        heartbeat_periodically(presence, settings.PRESENCE_TTL_SECONDS / 3)
+    )
+    app.state.index_bus_task = asyncio.create_task(index_bus.run())
+    
+    logger.info("RESQ API started successfully!")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs and persist in-memory state"""
+    app.state.location_flush_task.cancel()
+    app.state.counter_reconcile_task.cancel()
+    app.state.replica_check_task.cancel()
+    if settings.ARCHIVE_ENABLED:
+        app.state.archive_task.cancel()
+    app.state.presence_heartbeat_task.cancel()
+    app.state.index_bus_task.cancel()
+    await event_batcher.flush_all()
+    flushed = flush_live_locations()
+    logger.info("Flushed %d live locations", flushed)
+    password_hasher.shutdown()
+    saved = save_revocations()
+    logger.info("Saved %d revoked refresh tokens", saved)
+    shutdown_logging()
 
 
 @app.get("/")
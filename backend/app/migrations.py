@@ -0,0 +1,199 @@
+"""Versioned schema migrations.
+
+Each migration runs once, in order, and is recorded in the schema_version
+table. Steps check the live schema before changing it, so databases created
+by the old `create_all` startup (or by an earlier step) upgrade cleanly.
+
+    python -m app.migrations           # apply pending migrations
+    python -m app.migrations --status  # show the current version
+"""
+import sys
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+from app.database import Base, engine as default_engine
+from app.models import ARCHIVE_MODELS, Broadcast, Comment, IncidentReport, Message, SOSRequest, Task, User
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Arbitrary key for the Postgres advisory lock serializing concurrent upgrades
+MIGRATION_LOCK_KEY = 72_531_004
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _indexes_by_name() -> Dict[str, Index]:
+    return {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+
+
+def create_tables(conn: Connection, models: Iterable) -> None:
+    Base.metadata.create_all(conn, tables=[model.__table__ for model in models], checkfirst=True)
+
+
+def add_column(conn: Connection, model, column_name: str) -> None:
+    """Add a model column the table lacks (nullable, or NOT NULL with a server default)"""
+    table = model.__table__
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    if column_name in existing:
+        return
+    column = table.c[column_name]
+    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    for foreign_key in column.foreign_keys:
+        ddl += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+    conn.execute(text(ddl))
+
+
+def create_indexes(conn: Connection, names: Iterable[str]) -> None:
+    """Create the named model indexes that are not in the database yet"""
+    declared = _indexes_by_name()
+    inspector = inspect(conn)
+    for name in names:
+        index = declared[name]
+        existing = {item["name"] for item in inspector.get_indexes(index.table.name)}
+        if name not in existing:
+            index.create(conn)
+
+
+CORE_MODELS = (User, SOSRequest, IncidentReport, Task, Message, Comment, Broadcast)
+
+KEYSET_INDEXES = (
+    "ix_users_created_at_id",
+    "ix_users_role_created_at_id",
+    "ix_sos_requests_created_at_id",
+    "ix_sos_requests_citizen_created_at_id",
+    "ix_incident_reports_created_at_id",
+    "ix_incident_reports_citizen_created_at_id",
+    "ix_tasks_assigned_at_id",
+    "ix_tasks_volunteer_assigned_at_id",
+    "ix_messages_created_at_id",
+    "ix_messages_task_created_at_id",
+    "ix_comments_task_created_at_id",
+)
+
+HOT_FILTER_INDEXES = (
+    "ix_users_role_volunteer_status",
+    "ix_sos_requests_status_created_at_id",
+    "ix_sos_requests_primary_status",
+    "ix_sos_requests_duplicate_of_id",
+    "ix_incident_reports_status_type_created_at_id",
+    "ix_tasks_volunteer_status",
+    "ix_tasks_status_assigned_at_id",
+    "ix_tasks_sos_request_id",
+    "ix_tasks_incident_report_id",
+    "ix_messages_recipient_is_read",
+    "ix_messages_broadcasts",
+    "ix_sos_requests_archive_status_created_at_id",
+    "ix_incident_reports_archive_status_type_created_at_id",
+    "ix_tasks_archive_status_assigned_at_id",
+)
+
+def add_version_columns(conn: Connection) -> None:
+    for model in (Task, IncidentReport):
+        add_column(conn, model, "version")
+        add_column(conn, ARCHIVE_MODELS[model], "version")
+
+
+def stop_sqlite_id_reuse(conn: Connection) -> None:
+    """Rebuild archived SQLite tables with AUTOINCREMENT and start each sequence past every archived id.
+
+    Uses SQLite's create-copy-drop-rename procedure; foreign key enforcement
+    is off on these connections, so references from other tables survive.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    for model, archive_model in ARCHIVE_MODELS.items():
+        table = model.__table__
+        ddl = conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                          {"name": table.name})
+        if "AUTOINCREMENT" not in ddl.upper():
+            columns = ", ".join(column.name for column in table.columns)
+            create = str(CreateTable(table).compile(conn)).replace(
+                f"CREATE TABLE {table.name} ", f"CREATE TABLE {table.name}_rebuild ", 1
+            )
+            conn.execute(text(create))
+            conn.execute(text(f"INSERT INTO {table.name}_rebuild ({columns}) SELECT {columns} FROM {table.name}"))
+            conn.execute(text(f"DROP TABLE {table.name}"))
+            conn.execute(text(f"ALTER TABLE {table.name}_rebuild RENAME TO {table.name}"))
+            for index in table.indexes:
+                index.create(conn)
+
+        highest = max(
+            conn.scalar(select(func.max(table.c.id))) or 0,
+            conn.scalar(select(func.max(archive_model.__table__.c.id))) or 0,
+        )
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table.name})
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                     {"name": table.name, "seq": highest})
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Create core tables", lambda conn: create_tables(conn, CORE_MODELS)),
+    Migration(2, "Add sos_requests.duplicate_of_id", lambda conn: add_column(conn, SOSRequest, "duplicate_of_id")),
+    Migration(3, "Keyset pagination indexes", lambda conn: create_indexes(conn, KEYSET_INDEXES)),
+    Migration(4, "Archive tables", lambda conn: create_tables(conn, ARCHIVE_MODELS.values())),
+    Migration(5, "Hot filter composite and partial indexes", lambda conn: create_indexes(conn, HOT_FILTER_INDEXES)),
+    Migration(6, "Version columns on tasks and incident reports", add_version_columns),
+    Migration(7, "Never reuse ids of archived tables on SQLite", stop_sqlite_id_reuse),
+]
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.scalar(select(schema_version.c.version).order_by(schema_version.c.version.desc()).limit(1)) or 0
+
+
+def migrate(engine: Engine = default_engine) -> List[int]:
+    """Apply pending migrations in one transaction and return the versions applied"""
+    applied = []
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Workers starting together queue here instead of racing the DDL
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        schema_version.create(conn, checkfirst=True)
+        version = current_version(conn)
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            migration.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.utcnow()
+            ))
+            applied.append(migration.version)
+    return applied
+
+
+def main(argv: List[str]) -> None:
+    if "--status" in argv:
+        with default_engine.connect() as conn:
+            version = current_version(conn)
+        latest = MIGRATIONS[-1].version
+        print(f"Schema version {version} (latest {latest})")
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version <= version else "pending"
+            print(f"  {migration.version:>3}  {state:<8} {migration.description}")
+        return
+    applied = migrate()
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
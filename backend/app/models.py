@@ -1,10 +1,23 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import (
+    Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Index, Table, Text, Enum as SQLEnum, text
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Optional
 import enum
 from app.database import Base
 
 
+def partial(where: str, sqlite_where: Optional[str] = None) -> dict:
+    """Index keyword arguments for a partial index on Postgres and SQLite"""
+    return {"postgresql_where": text(where), "sqlite_where": text(sqlite_where or where)}
+
+
+# Tables with an archive copy never reuse ids: SQLite otherwise hands out the id of the highest
+# row again once it is archived, which collides in *_archive and in include_archived reads
+NO_ID_REUSE = {"sqlite_autoincrement": True}
+
+
 class UserRole(str, enum.Enum):
     """User role enumeration"""
     CITIZEN = "citizen"
@@ -45,6 +58,13 @@ class IncidentType(str, enum.Enum):
 class User(Base):
     """User model for all roles"""
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_role_created_at_id", "role", "created_at", "id"),
+        # Online volunteer lookups for dispatch and the dashboard
+        Index("ix_users_role_volunteer_status", "role", "volunteer_status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=True)
@@ -76,6 +96,16 @@ class User(Base):
 class SOSRequest(Base):
     """SOS emergency request model"""
     __tablename__ = "sos_requests"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_sos_requests_created_at_id", "created_at", "id"),
+        Index("ix_sos_requests_citizen_created_at_id", "citizen_id", "created_at", "id"),
+        # Status filters, pending work and duplicate links
+        Index("ix_sos_requests_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_sos_requests_primary_status", "status", "created_at", **partial("duplicate_of_id IS NULL")),
+        Index("ix_sos_requests_duplicate_of_id", "duplicate_of_id", **partial("duplicate_of_id IS NOT NULL")),
+        NO_ID_REUSE,
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     citizen_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -83,6 +113,7 @@ class SOSRequest(Base):
     longitude = Column(Float, nullable=False)
     address = Column(String(500), nullable=True)
     status = Column(SQLEnum(TaskStatus), default=TaskStatus.PENDING)
+    duplicate_of_id = Column(Integer, ForeignKey("sos_requests.id"), nullable=True)  # Linked to an open SOS nearby
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -94,6 +125,14 @@ class SOSRequest(Base):
 class IncidentReport(Base):
     """Incident report model"""
     __tablename__ = "incident_reports"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_incident_reports_created_at_id", "created_at", "id"),
+        Index("ix_incident_reports_citizen_created_at_id", "citizen_id", "created_at", "id"),
+        # Status and type filters
+        Index("ix_incident_reports_status_type_created_at_id", "status", "incident_type", "created_at", "id"),
+        NO_ID_REUSE,
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     citizen_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -107,15 +146,30 @@ class IncidentReport(Base):
     status = Column(SQLEnum(TaskStatus), default=TaskStatus.PENDING)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every ORM update; socket deltas carry it so clients can spot missed updates
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationships
     citizen = relationship("User", back_populates="incident_reports", foreign_keys=[citizen_id])
     tasks = relationship("Task", back_populates="incident_report")
+    
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Task(Base):
     """Task assignment model"""
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_tasks_assigned_at_id", "assigned_at", "id"),
+        Index("ix_tasks_volunteer_assigned_at_id", "volunteer_id", "assigned_at", "id"),
+        # Active-load counts, status filters and relationship loads
+        Index("ix_tasks_volunteer_status", "volunteer_id", "status"),
+        Index("ix_tasks_status_assigned_at_id", "status", "assigned_at", "id"),
+        Index("ix_tasks_sos_request_id", "sos_request_id"),
+        Index("ix_tasks_incident_report_id", "incident_report_id"),
+        NO_ID_REUSE,
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     volunteer_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -126,17 +180,30 @@ class Task(Base):
     accepted_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     notes = Column(Text, nullable=True)
+    # Bumped by every ORM update; socket deltas carry it so clients can spot missed updates
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationships
     volunteer = relationship("User", back_populates="assigned_tasks", foreign_keys=[volunteer_id])
     sos_request = relationship("SOSRequest", back_populates="tasks")
     incident_report = relationship("IncidentReport", back_populates="tasks")
     comments = relationship("Comment", back_populates="task")
+    
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Message(Base):
     """Chat message model"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_messages_created_at_id", "created_at", "id"),
+        Index("ix_messages_task_created_at_id", "task_id", "created_at", "id"),
+        # Unread counts and the broadcast feed
+        Index("ix_messages_recipient_is_read", "recipient_id", "is_read"),
+        Index("ix_messages_broadcasts", "created_at", "id", **partial("is_broadcast = true", "is_broadcast = 1")),
+        NO_ID_REUSE,
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -154,6 +221,11 @@ class Message(Base):
 class Comment(Base):
     """Comment/Note on tasks"""
     __tablename__ = "comments"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_comments_task_created_at_id", "task_id", "created_at", "id"),
+        NO_ID_REUSE,
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
@@ -176,3 +248,80 @@ class Broadcast(Base):
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+
+
+# ========== Archive tables ==========
+def archive_table(model) -> Table:
+    """Cold copy of a model's table: same columns and (..., id) ordering indexes, no foreign keys"""
+    table = model.__table__
+    name = f"{table.name}_archive"
+    columns = [
+        Column(column.name, column.type.copy(), primary_key=column.primary_key, autoincrement=False,
+               nullable=column.nullable,
+               server_default=column.server_default.arg if column.server_default is not None
+               else None)
+        for column in table.columns
+    ]
+    indexes = []
+    for index in table.indexes:
+        names = [column.name for column in index.columns]
+        if len(names) > 1 and names[-1] == "id" and index.dialect_options["postgresql"]["where"] is None:
+            indexes.append(Index(index.name.replace(table.name, name, 1), *names))
+    return Table(name, Base.metadata, *columns, Column("archived_at", DateTime, nullable=False), *indexes)
+
+
+class ArchivedSOSRequest(Base):
+    """Closed SOS request moved out of sos_requests"""
+    __table__ = archive_table(SOSRequest)
+    
+    citizen = relationship("User", primaryjoin="foreign(ArchivedSOSRequest.citizen_id) == User.id", viewonly=True)
+    tasks = relationship("ArchivedTask", primaryjoin="foreign(ArchivedTask.sos_request_id) == ArchivedSOSRequest.id",
+                         viewonly=True)
+
+
+class ArchivedIncidentReport(Base):
+    """Closed incident report moved out of incident_reports"""
+    __table__ = archive_table(IncidentReport)
+    
+    citizen = relationship("User", primaryjoin="foreign(ArchivedIncidentReport.citizen_id) == User.id",
+                           viewonly=True)
+    tasks = relationship("ArchivedTask",
+                         primaryjoin="foreign(ArchivedTask.incident_report_id) == ArchivedIncidentReport.id",
+                         viewonly=True)
+
+
+class ArchivedTask(Base):
+    """Task archived together with its SOS request or incident"""
+    __table__ = archive_table(Task)
+    
+    volunteer = relationship("User", primaryjoin="foreign(ArchivedTask.volunteer_id) == User.id", viewonly=True)
+    sos_request = relationship("ArchivedSOSRequest",
+                               primaryjoin="foreign(ArchivedTask.sos_request_id) == ArchivedSOSRequest.id",
+                               viewonly=True)
+    incident_report = relationship("ArchivedIncidentReport",
+                                   primaryjoin="foreign(ArchivedTask.incident_report_id) == ArchivedIncidentReport.id",
+                                   viewonly=True)
+
+
+class ArchivedMessage(Base):
+    """Message archived with its task, or an old read/broadcast message"""
+    __table__ = archive_table(Message)
+    
+    sender = relationship("User", primaryjoin="foreign(ArchivedMessage.sender_id) == User.id", viewonly=True)
+
+
+class ArchivedComment(Base):
+    """Comment archived with its task"""
+    __table__ = archive_table(Comment)
+    
+    author = relationship("User", primaryjoin="foreign(ArchivedComment.author_id) == User.id", viewonly=True)
+
+
+# Live model -> archive model
+ARCHIVE_MODELS = {
+    SOSRequest: ArchivedSOSRequest,
+    IncidentReport: ArchivedIncidentReport,
+    Task: ArchivedTask,
+    Message: ArchivedMessage,
+    Comment: ArchivedComment,
+}
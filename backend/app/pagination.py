@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query as ORMQuery
+from app.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """`cursor` and `limit` query parameters shared by every list endpoint"""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX)
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _page_rows(query: ORMQuery, sort_column, id_column, page: PageParams, descending: bool) -> List:
+    if page.cursor:
+        position = tuple_(sort_column, id_column)
+        after = tuple_(*decode_cursor(page.cursor))
+        query = query.filter(position < after if descending else position > after)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    return query.limit(page.limit + 1).all()
+
+
+def paginate(query: ORMQuery, sort_column, id_column, page: PageParams, response: Response,
+             descending: bool = True) -> List:
+    """Apply keyset pagination on (sort_column, id_column) and return one page.
+
+    Rows are ordered by the pair so the cursor position is unambiguous, and
+    the next page starts strictly after the last row returned, which a
+    composite index on the same pair can seek to directly. The cursor for
+    the following page is sent in the X-Next-Cursor header.
+    """
+    return paginate_merged([(query, sort_column, id_column)], page, response, descending)
+
+
+def paginate_merged(sources: List[Tuple[ORMQuery, object, object]], page: PageParams, response: Response,
+                    descending: bool = True) -> List:
+    """Keyset-paginate several queries sharing the same (sort, id) attribute names as one sequence.
+
+    Each source reads at most one page past the cursor, and the rows are
+    merged in memory, so a live table and its archive page together.
+    """
+    rows = []
+    for query, sort_column, id_column in sources:
+        rows.extend(_page_rows(query, sort_column, id_column, page, descending))
+    sort_column, id_column = sources[0][1], sources[0][2]
+    if len(sources) > 1:
+        rows.sort(key=lambda row: (getattr(row, sort_column.key), getattr(row, id_column.key)), reverse=descending)
+
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+    return rows
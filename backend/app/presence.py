@@ -0,0 +1,142 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class LocalPresence:
+    """Connected sockets per user, for a single worker process"""
+
+    def __init__(self):
+        self._sids: Dict[int, Set[str]] = {}
+        self._regions: Dict[int, str] = {}
+
+    async def add(self, user_id: int, sid: str):
+        self._sids.setdefault(user_id, set()).add(sid)
+
+    async def remove(self, user_id: int, sid: str) -> bool:
+        """Drop a socket; returns True when it was the user's last one"""
+        sids = self._sids.get(user_id)
+        if sids is not None:
+            sids.discard(sid)
+            if sids:
+                return False
+            del self._sids[user_id]
+        self._regions.pop(user_id, None)
+        return True
+
+    async def sids(self, user_id: int) -> List[str]:
+        return list(self._sids.get(user_id, ()))
+
+    async def is_online(self, user_id: int) -> bool:
+        return user_id in self._sids
+
+    async def online_users(self) -> List[int]:
+        return list(self._sids)
+
+    async def region(self, user_id: int) -> Optional[str]:
+        """Region room a connected volunteer sits in ("" before their first fix, None if untracked)"""
+        return self._regions.get(user_id)
+
+    async def set_region(self, user_id: int, room: str):
+        self._regions[user_id] = room
+
+    async def heartbeat(self):
+        pass
+
+
+class RedisPresence:
+    """Presence shared by every worker through a Redis-protocol server.
+
+    Each socket is a member of a per-user sorted set scored by its expiry.
+    Workers refresh their own sockets every heartbeat, so the sockets of a
+    worker that dies without cleaning up disappear after `ttl` seconds.
+    """
+
+    def __init__(self, url: str, ttl: float, prefix: str = "presence"):
+        from redis import asyncio as aioredis
+
+        self.redis = aioredis.Redis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._users_key = f"{prefix}:users"
+        self._regions_key = f"{prefix}:regions"
+        self._local: Dict[str, int] = {}
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}:user:{user_id}"
+
+    async def add(self, user_id: int, sid: str):
+        self._local[sid] = user_id
+        expires = time.time() + self.ttl
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self._user_key(user_id), {sid: expires})
+            pipe.zadd(self._users_key, {str(user_id): expires})
+            await pipe.execute()
+
+    async def remove(self, user_id: int, sid: str) -> bool:
+        """Drop a socket; returns True when the user has no live socket on any worker"""
+        self._local.pop(sid, None)
+        key = self._user_key(user_id)
+        await self.redis.zrem(key, sid)
+        if await self.redis.zcount(key, time.time(), "+inf"):
+            return False
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(key)
+            pipe.zrem(self._users_key, str(user_id))
+            pipe.hdel(self._regions_key, str(user_id))
+            await pipe.execute()
+        return True
+
+    async def sids(self, user_id: int) -> List[str]:
+        return await self.redis.zrangebyscore(self._user_key(user_id), time.time(), "+inf")
+
+    async def is_online(self, user_id: int) -> bool:
+        expires = await self.redis.zscore(self._users_key, str(user_id))
+        return expires is not None and expires > time.time()
+
+    async def online_users(self) -> List[int]:
+        return [int(user_id) for user_id in await self.redis.zrangebyscore(self._users_key, time.time(), "+inf")]
+
+    async def region(self, user_id: int) -> Optional[str]:
+        return await self.redis.hget(self._regions_key, str(user_id))
+
+    async def set_region(self, user_id: int, room: str):
+        await self.redis.hset(self._regions_key, str(user_id), room)
+
+    async def heartbeat(self):
+        """Extend this worker's sockets and forget users whose sockets all expired"""
+        now = time.time()
+        expires = now + self.ttl
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for sid, user_id in list(self._local.items()):
+                pipe.zadd(self._user_key(user_id), {sid: expires})
+                pipe.zadd(self._users_key, {str(user_id): expires})
+            await pipe.execute()
+
+        expired = await self.redis.zrangebyscore(self._users_key, "-inf", now)
+        if expired:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zrem(self._users_key, *expired)
+                pipe.hdel(self._regions_key, *expired)
+                pipe.delete(*[self._user_key(int(user_id)) for user_id in expired])
+                await pipe.execute()
+
+
+def create_presence(url: str, ttl: float):
+    """Shared presence when a Redis message queue is configured, in-process otherwise"""
+    if url.split("://", 1)[0] in ("redis", "rediss"):
+        return RedisPresence(url, ttl)
+    return LocalPresence()
+
+
+async def heartbeat_periodically(registry, interval: float):
+    """Background loop keeping this worker's sockets alive in the shared registry"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await registry.heartbeat()
+        except Exception:
+            logger.exception("Presence heartbeat failed")
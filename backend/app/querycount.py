@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.database import engine as default_engine
+
+
+class QueryCounter:
+    """SQL statements executed on an engine while the counter is active"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine: Engine = default_engine) -> Iterator[QueryCounter]:
+    """Count every statement sent to the database inside the block"""
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._record)
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine: Engine = default_engine) -> Iterator[QueryCounter]:
+    """Fail if the block issues more than `limit` statements (catches N+1 regressions)"""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i + 1}. {sql.splitlines()[0]}" for i, sql in enumerate(counter.statements))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
@@ -0,0 +1,48 @@
+import json
+from typing import List
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Executable
+
+
+def _literal_sql(conn: Connection, statement: Executable) -> str:
+    return str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _postgres_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _postgres_nodes(child)
+
+
+def explain(conn: Connection, statement: Executable) -> List[str]:
+    """The database's plan for a statement, one line per step"""
+    sql = _literal_sql(conn, statement)
+    if conn.dialect.name == "postgresql":
+        raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+        plan = (raw if isinstance(raw, list) else json.loads(raw))[0]["Plan"]
+        return [
+            " ".join(str(node[key]) for key in ("Node Type", "Relation Name", "Index Name") if key in node)
+            for node in _postgres_nodes(plan)
+        ]
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def plan_problems(conn: Connection, statement: Executable) -> List[str]:
+    """Full table scans and sorts the indexes should have avoided"""
+    if conn.dialect.name == "postgresql":
+        # Tiny test tables are cheaper to scan; ask whether an index *could* serve the query
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        return [step for step in explain(conn, statement) if step.startswith(("Seq Scan", "Sort"))]
+    return [
+        step for step in explain(conn, statement)
+        if (step.startswith("SCAN ") and " USING " not in step) or "TEMP B-TREE" in step
+    ]
+
+
+def assert_uses_indexes(conn: Connection, statement: Executable) -> List[str]:
+    """Fail if a statement's plan falls back to a full scan or an explicit sort; returns the plan"""
+    problems = plan_problems(conn, statement)
+    if problems:
+        plan = "\n".join(f"  {step}" for step in explain(conn, statement))
+        raise AssertionError(f"Plan does not use an index ({', '.join(problems)}):\n{plan}")
+    return explain(conn, statement)
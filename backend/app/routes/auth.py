@@ -1,20 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, UserRole
-from app.schemas import UserCreate, UserLogin, Token, UserResponse
-from app.auth import authenticate_user, create_access_token, create_refresh_token, get_password_hash
+from app.database import get_db, get_async_db
+from app.models import User
+from app.schemas import UserCreate, UserLogin, Token, TokenRefresh, RefreshedToken, UserResponse
+from app.auth import authenticate_user, create_access_token, create_refresh_token, rotate_refresh_token
+from app.hashing import password_hasher
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register", response_model=Token)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     
     # Check if user already exists
     if user_data.email:
-        existing = db.query(User).filter(User.email == user_data.email).first()
+        existing = await db.scalar(select(User).where(User.email == user_data.email))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -22,7 +25,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
     
     if user_data.phone:
-        existing = db.query(User).filter(User.phone == user_data.phone).first()
+        existing = await db.scalar(select(User).where(User.phone == user_data.phone))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -30,7 +33,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
     
     if user_data.volunteer_id:
-        existing = db.query(User).filter(User.volunteer_id == user_data.volunteer_id).first()
+        existing = await db.scalar(select(User).where(User.volunteer_id == user_data.volunteer_id))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -38,7 +41,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = User(
         email=user_data.email,
         phone=user_data.phone,
@@ -49,8 +52,8 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     # Create tokens
     access_token = create_access_token(data={"sub": str(db_user.id), "role": db_user.role.value})
@@ -64,10 +67,10 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user"""
     
-    user = authenticate_user(db, credentials.identifier, credentials.password, credentials.role)
+    user = await authenticate_user(db, credentials.identifier, credentials.password, credentials.role)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -83,3 +86,9 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
         refresh_token=refresh_token,
         user=UserResponse.model_validate(user)
     )
+
+
+@router.post("/refresh", response_model=RefreshedToken)
+def refresh(body: TokenRefresh, db: Session = Depends(get_db)):
+    """Rotate a refresh token into a new access/refresh token pair"""
+    return RefreshedToken(**rotate_refresh_token(body.refresh_token, db))
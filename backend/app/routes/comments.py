@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
-from app.models import Comment, User, Task, UserRole
+from app.models import Comment, Task, UserRole, ArchivedComment, ArchivedTask
 from app.schemas import CommentCreate, CommentResponse
-from app.auth import get_current_user
+from app.identity import UserIdentity
+from app.auth import get_current_identity
+from app.pagination import PageParams, paginate_merged
+from app.loaders import COMMENT_LOAD_OPTIONS, ARCHIVED_COMMENT_LOAD_OPTIONS
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
@@ -12,7 +15,7 @@ router = APIRouter(prefix="/comments", tags=["Comments"])
 @router.post("/", response_model=CommentResponse)
 def create_comment(
     comment_data: CommentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     db: Session = Depends(get_db)
 ):
     """Add a comment to a task"""
@@ -58,13 +61,18 @@ def create_comment(
 @router.get("/task/{task_id}", response_model=List[CommentResponse])
 def get_task_comments(
     task_id: int,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
     db: Session = Depends(get_db)
 ):
-    """Get all comments for a task"""
+    """Get comments for a task, oldest first, optionally including archived ones"""
     
     # Verify task exists
     task = db.query(Task).filter(Task.id == task_id).first()
+    if not task and include_archived:
+        task = db.query(ArchivedTask).filter(ArchivedTask.id == task_id).first()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -88,9 +96,15 @@ def get_task_comments(
             detail="Not authorized to view comments for this task"
         )
     
-    comments = db.query(Comment).filter(
-        Comment.task_id == task_id
-    ).order_by(Comment.created_at.asc()).all()
+    models = [(Comment, COMMENT_LOAD_OPTIONS)]
+    if include_archived:
+        models.append((ArchivedComment, ARCHIVED_COMMENT_LOAD_OPTIONS))
+    
+    sources = [
+        (db.query(model).options(*options).filter(model.task_id == task_id), model.created_at, model.id)
+        for model, options in models
+    ]
+    comments = paginate_merged(sources, page, response, descending=False)
     
     return [CommentResponse.model_validate(comment) for comment in comments]
 
@@ -98,7 +112,7 @@ def get_task_comments(
 @router.delete("/{comment_id}")
 def delete_comment(
     comment_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     db: Session = Depends(get_db)
 ):
     """Delete a comment"""
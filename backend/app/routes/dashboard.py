@@ -1,65 +1,59 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, SOSRequest, IncidentReport, Task, TaskStatus, UserRole, VolunteerStatus
+from app.database import get_read_db
+from app.models import SOSRequest, IncidentReport, Task, TaskStatus, UserRole
 from app.schemas import DashboardStats
-from app.auth import get_current_user
+from app.identity import UserIdentity
+from app.auth import get_current_identity
+from app.stats import dashboard_counters
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
 @router.get("/stats", response_model=DashboardStats)
 def get_dashboard_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
     """Get dashboard statistics"""
     
     stats = {}
     
     if current_user.role == UserRole.ADMIN:
-        # Admin sees all stats
-        stats["total_sos"] = db.query(SOSRequest).count()
-        stats["total_incidents"] = db.query(IncidentReport).count()
-        stats["pending_tasks"] = db.query(Task).filter(
-            Task.status.in_([TaskStatus.PENDING, TaskStatus.ASSIGNED])
-        ).count()
-        stats["active_volunteers"] = db.query(User).filter(
-            User.role == UserRole.VOLUNTEER,
-            User.volunteer_status == VolunteerStatus.ONLINE
-        ).count()
-        stats["total_users"] = db.query(User).filter(User.role == UserRole.CITIZEN).count()
-        stats["resolved_tasks"] = db.query(Task).filter(
-            Task.status == TaskStatus.COMPLETED
-        ).count()
+        # Admin sees all stats, served from the in-memory counters
+        counts = dashboard_counters.snapshot()
+        stats["total_sos"] = counts["sos_total"]
+        stats["total_incidents"] = counts["incidents_total"]
+        stats["pending_tasks"] = counts["tasks_pending"]
+        stats["active_volunteers"] = counts["volunteers_online"]
+        stats["total_users"] = counts["citizens"]
+        stats["resolved_tasks"] = counts["tasks_completed"]
     
     elif current_user.role == UserRole.VOLUNTEER:
         # Volunteer sees their stats
-        stats["total_sos"] = db.query(SOSRequest).filter(
-            SOSRequest.status != TaskStatus.COMPLETED
-        ).count()
-        stats["total_incidents"] = db.query(IncidentReport).filter(
-            IncidentReport.status != TaskStatus.COMPLETED
-        ).count()
-        stats["pending_tasks"] = db.query(Task).filter(
-            Task.volunteer_id == current_user.id,
-            Task.status.in_([TaskStatus.ASSIGNED, TaskStatus.ACCEPTED, TaskStatus.RESPONDING])
-        ).count()
+        counts = dashboard_counters.snapshot()
+        stats["total_sos"] = counts["sos_total"] - counts["sos_completed"]
+        stats["total_incidents"] = counts["incidents_total"] - counts["incidents_completed"]
+        stats["pending_tasks"], stats["resolved_tasks"] = db.execute(
+            select(
+                func.count().filter(
+                    Task.status.in_([TaskStatus.ASSIGNED, TaskStatus.ACCEPTED, TaskStatus.RESPONDING])
+                ),
+                func.count().filter(Task.status == TaskStatus.COMPLETED)
+            ).where(Task.volunteer_id == current_user.id)
+        ).one()
         stats["active_volunteers"] = 0
         stats["total_users"] = 0
-        stats["resolved_tasks"] = db.query(Task).filter(
-            Task.volunteer_id == current_user.id,
-            Task.status == TaskStatus.COMPLETED
-        ).count()
     
     else:  # Citizen
         # Citizen sees their stats
-        stats["total_sos"] = db.query(SOSRequest).filter(
-            SOSRequest.citizen_id == current_user.id
-        ).count()
-        stats["total_incidents"] = db.query(IncidentReport).filter(
-            IncidentReport.citizen_id == current_user.id
-        ).count()
+        stats["total_sos"], stats["total_incidents"] = db.execute(
+            select(
+                select(func.count()).where(SOSRequest.citizen_id == current_user.id).scalar_subquery(),
+                select(func.count()).where(IncidentReport.citizen_id == current_user.id).scalar_subquery()
+            )
+        ).one()
         stats["pending_tasks"] = 0
         stats["active_volunteers"] = 0
         stats["total_users"] = 0
@@ -1,20 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
-from app.models import IncidentReport, User, TaskStatus
+from app.database import get_db, get_read_db, get_async_db
+from app.models import IncidentReport, ArchivedIncidentReport, TaskStatus
 from app.schemas import IncidentReportCreate, IncidentReportResponse, IncidentReportUpdate
-from app.auth import get_current_user, get_current_citizen, get_current_admin
-from app.socketio_server import emit_incident_created
+from app.identity import UserIdentity
+from app.auth import get_current_identity, get_current_citizen, get_current_admin
+from app.pagination import PageParams, paginate_merged
+from app.socketio_server import emit_incident_created, emit_incident_updated
+from app.geo import forget_item, sync_item
+from app.loaders import INCIDENT_LOAD_OPTIONS, ARCHIVED_INCIDENT_LOAD_OPTIONS
+from app.deltas import versioned_delta
 
 router = APIRouter(prefix="/incidents", tags=["Incident Reports"])
 
 
+async def load_incident(db: AsyncSession, incident_id: int) -> IncidentReport:
+    """Reload an incident with everything IncidentReportResponse serializes"""
+    # Expire rather than populate_existing, which would re-populate the parent through tasks and drop them
+    db.expire_all()
+    return await db.scalar(
+        select(IncidentReport).options(*INCIDENT_LOAD_OPTIONS).where(IncidentReport.id == incident_id)
+    )
+
+
 @router.post("/", response_model=IncidentReportResponse)
 async def create_incident_report(
     incident_data: IncidentReportCreate,
-    current_user: User = Depends(get_current_citizen),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_citizen),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create new incident report (Citizen only)"""
     
@@ -31,8 +47,11 @@ async def create_incident_report(
     )
     
     db.add(incident)
-    db.commit()
-    db.refresh(incident)
+    await db.commit()
+    incident = await load_incident(db, incident.id)
+    
+    sync_item("incident", incident.id, incident.latitude, incident.longitude, incident.status,
+              incident.incident_type.value)
     
     # Emit socket event
     incident_response = IncidentReportResponse.model_validate(incident)
@@ -43,42 +62,59 @@ async def create_incident_report(
 
 @router.get("/", response_model=List[IncidentReportResponse])
 def get_all_incidents(
+    response: Response,
     status_filter: str = None,
     incident_type: str = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
-    """Get all incident reports"""
-    
-    query = db.query(IncidentReport)
-    
-    # Citizens can only see their own incidents
-    if current_user.role.value == "citizen":
-        query = query.filter(IncidentReport.citizen_id == current_user.id)
+    """Get all incident reports, newest first, optionally including archived ones"""
     
+    task_status = None
     if status_filter:
         try:
             task_status = TaskStatus(status_filter)
-            query = query.filter(IncidentReport.status == task_status)
         except ValueError:
             pass
     
-    if incident_type:
-        query = query.filter(IncidentReport.incident_type == incident_type)
-    
-    incidents = query.order_by(IncidentReport.created_at.desc()).all()
+    models = [(IncidentReport, INCIDENT_LOAD_OPTIONS)]
+    if include_archived:
+        models.append((ArchivedIncidentReport, ARCHIVED_INCIDENT_LOAD_OPTIONS))
+    
+    sources = []
+    for model, options in models:
+        query = db.query(model).options(*options)
+        
+        # Citizens can only see their own incidents
+        if current_user.role.value == "citizen":
+            query = query.filter(model.citizen_id == current_user.id)
+        
+        if task_status:
+            query = query.filter(model.status == task_status)
+        
+        if incident_type:
+            query = query.filter(model.incident_type == incident_type)
+        
+        sources.append((query, model.created_at, model.id))
+    
+    incidents = paginate_merged(sources, page, response)
     return [IncidentReportResponse.model_validate(inc) for inc in incidents]
 
 
 @router.get("/{incident_id}", response_model=IncidentReportResponse)
 def get_incident(
     incident_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
-    """Get incident report by ID"""
+    """Get incident report by ID, falling back to the archive when asked"""
     
     incident = db.query(IncidentReport).filter(IncidentReport.id == incident_id).first()
+    if not incident and include_archived:
+        incident = db.query(ArchivedIncidentReport).filter(ArchivedIncidentReport.id == incident_id).first()
     if not incident:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,21 +132,23 @@ def get_incident(
 
 
 @router.put("/{incident_id}", response_model=IncidentReportResponse)
-def update_incident(
+async def update_incident(
     incident_id: int,
     update_data: IncidentReportUpdate,
-    current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update incident report (Admin only)"""
     
-    incident = db.query(IncidentReport).filter(IncidentReport.id == incident_id).first()
+    incident = await load_incident(db, incident_id)
     if not incident:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Incident report not found"
         )
     
+    before = IncidentReportResponse.model_validate(incident).model_dump(mode='json')
+    
     if update_data.status:
         incident.status = update_data.status
     if update_data.incident_type:
@@ -120,16 +158,25 @@ def update_incident(
     if update_data.description:
         incident.description = update_data.description
     
-    db.commit()
-    db.refresh(incident)
+    await db.commit()
+    incident = await load_incident(db, incident_id)
     
-    return IncidentReportResponse.model_validate(incident)
+    sync_item("incident", incident.id, incident.latitude, incident.longitude, incident.status,
+              incident.incident_type.value)
+    
+    # Emit only what changed, stamped with the incident version
+    incident_response = IncidentReportResponse.model_validate(incident)
+    delta = versioned_delta(before, incident_response.model_dump(mode='json'))
+    if delta["version"] != delta["base_version"]:
+        await emit_incident_updated(delta, incident.citizen_id)
+    
+    return incident_response
 
 
 @router.delete("/{incident_id}")
 def delete_incident(
     incident_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: UserIdentity = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete incident report (Admin only)"""
@@ -144,4 +191,6 @@ def delete_incident(
     db.delete(incident)
     db.commit()
     
+    forget_item("incident", incident_id)
+    
     return {"message": "Incident report deleted successfully"}
@@ -0,0 +1,244 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+from app.database import get_async_db
+from app.models import SOSRequest, IncidentReport, TaskStatus, User
+from app.schemas import (
+    BulkRecord, BulkSOSRecord, BulkIngestResult, BulkIngestResponse,
+    SOSRequestResponse, IncidentReportResponse
+)
+from app.identity import UserIdentity
+from app.auth import get_current_admin
+from app.config import settings
+from app.geo import GridIndex, sync_item
+from app.dedup import CLOSED_STATUSES, sos_deduplicator, register_primary
+from app.loaders import SOS_LOAD_OPTIONS, INCIDENT_LOAD_OPTIONS
+from app.socketio_server import emit_items_ingested
+
+router = APIRouter(prefix="/ingest", tags=["Bulk Ingest"])
+
+record_adapter = TypeAdapter(BulkRecord)
+
+
+def parse_body(body: bytes, content_type: str) -> List[Tuple[Optional[dict], Optional[str]]]:
+    """Split a NDJSON or JSON array body into (record, parse error) pairs"""
+    try:
+        text = body.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Body must be UTF-8 encoded"
+        )
+    
+    if "ndjson" not in content_type and text.startswith("["):
+        try:
+            records = json.loads(text)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid JSON: {exc}"
+            )
+        return [(record, None) for record in records]
+    
+    parsed = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            parsed.append((json.loads(line), None))
+        except ValueError as exc:
+            parsed.append((None, f"Invalid JSON: {exc}"))
+    return parsed
+
+
+def validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'][1:])}: {error['msg']}" if len(error['loc']) > 1
+        else error['msg']
+        for error in exc.errors()
+    )
+
+
+async def link_duplicates(db: AsyncSession, sos_records: List[Tuple[int, BulkSOSRecord]]) -> Dict[int, object]:
+    """Map record index -> (source, existing primary id or earlier batch index, status to inherit)"""
+    candidates = {
+        index: sos_deduplicator.candidates(record.latitude, record.longitude)
+        for index, record in sos_records
+    }
+    candidate_ids = {sos_id for ids in candidates.values() for sos_id in ids}
+    open_status = {}
+    if candidate_ids:
+        rows = await db.execute(
+            select(SOSRequest.id, SOSRequest.status).where(SOSRequest.id.in_(candidate_ids))
+        )
+        open_status = {sos_id: sos_status for sos_id, sos_status in rows if sos_status not in CLOSED_STATUSES}
+    
+    batch_primaries = GridIndex(cell_size=0.01)
+    links = {}
+    for index, record in sos_records:
+        existing = next((sos_id for sos_id in candidates[index] if sos_id in open_status), None)
+        if existing is not None:
+            links[index] = ("existing", existing, open_status[existing])
+            continue
+        nearby = batch_primaries.within_radius(record.latitude, record.longitude, settings.SOS_DEDUP_RADIUS_KM)
+        if nearby:
+            links[index] = ("batch", nearby[0][0], TaskStatus.PENDING)
+        else:
+            batch_primaries.insert(index, record.latitude, record.longitude)
+    return links
+
+
+async def bulk_insert(db: AsyncSession, model, rows: List[dict]) -> List[int]:
+    """Insert rows as one executemany statement and return their ids in order"""
+    if not rows:
+        return []
+    result = await db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+async def insert_records(db: AsyncSession, model, rows: List[dict], indexes: List[int],
+                         results: List[BulkIngestResult]):
+    """Insert rows and record each id (or error) on its result.
+
+    The rows go in as one executemany inside a savepoint. If the database
+    rejects any of them, that savepoint is rolled back and the rows are
+    retried one savepoint each, so only the offending records fail.
+    """
+    if not rows:
+        return
+    try:
+        async with db.begin_nested():
+            ids = await bulk_insert(db, model, rows)
+    except DBAPIError:
+        ids = []
+        for index, row in zip(indexes, rows):
+            try:
+                async with db.begin_nested():
+                    ids.extend(await bulk_insert(db, model, [row]))
+            except DBAPIError as exc:
+                ids.append(None)
+                results[index].error = f"Could not be stored: {exc.orig}"
+    for index, row_id in zip(indexes, ids):
+        results[index].id = row_id
+
+
+@router.post("/", response_model=BulkIngestResponse)
+async def ingest_records(
+    request: Request,
+    current_user: UserIdentity = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Bulk-create SOS requests and incidents from NDJSON or a JSON array (Admin only)"""
+    
+    raw_records = parse_body(await request.body(), request.headers.get("content-type", ""))
+    if len(raw_records) > settings.BULK_INGEST_MAX_RECORDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_INGEST_MAX_RECORDS} records per request"
+        )
+    
+    results = [BulkIngestResult(index=index) for index in range(len(raw_records))]
+    valid = []
+    for index, (raw, error) in enumerate(raw_records):
+        if isinstance(raw, dict):
+            results[index].type = raw.get("type") if isinstance(raw.get("type"), str) else None
+        if error:
+            results[index].error = error
+            continue
+        try:
+            record = record_adapter.validate_python(raw)
+        except ValidationError as exc:
+            results[index].error = validation_message(exc)
+            continue
+        if record.citizen_id is None:
+            record.citizen_id = current_user.id
+        valid.append((index, record))
+    
+    # Check every referenced citizen with a single query
+    citizen_ids = {record.citizen_id for _, record in valid}
+    known = set((await db.scalars(select(User.id).where(User.id.in_(citizen_ids)))).all()) if citizen_ids else set()
+    sos_records, incident_records = [], []
+    for index, record in valid:
+        if record.citizen_id not in known:
+            results[index].error = f"citizen_id {record.citizen_id} not found"
+        elif isinstance(record, BulkSOSRecord):
+            sos_records.append((index, record))
+        else:
+            incident_records.append((index, record))
+    
+    links = await link_duplicates(db, sos_records) if settings.SOS_DEDUP_ENABLED else {}
+    
+    def sos_row(record: BulkSOSRecord, sos_status: TaskStatus, duplicate_of_id: Optional[int]) -> dict:
+        return {
+            "citizen_id": record.citizen_id,
+            "latitude": record.latitude,
+            "longitude": record.longitude,
+            "address": record.address,
+            "status": sos_status,
+            "duplicate_of_id": duplicate_of_id,
+        }
+    
+    # Primaries go first so duplicates within the batch can reference their ids
+    primaries = [(index, record) for index, record in sos_records if index not in links]
+    await insert_records(
+        db, SOSRequest, [sos_row(record, TaskStatus.PENDING, None) for _, record in primaries],
+        [index for index, _ in primaries], results
+    )
+    
+    duplicates = [(index, record) for index, record in sos_records if index in links]
+    duplicate_rows = []
+    for index, record in duplicates:
+        source, target, inherited_status = links[index]
+        if source == "batch" and results[target].id is None:
+            # The batch primary could not be stored; this request stands on its own
+            duplicate_rows.append(sos_row(record, TaskStatus.PENDING, None))
+            continue
+        results[index].duplicate_of_id = target if source == "existing" else results[target].id
+        duplicate_rows.append(sos_row(record, inherited_status, results[index].duplicate_of_id))
+    await insert_records(db, SOSRequest, duplicate_rows, [index for index, _ in duplicates], results)
+    
+    await insert_records(db, IncidentReport, [
+        {
+            "citizen_id": record.citizen_id,
+            "incident_type": record.incident_type,
+            "title": record.title,
+            "description": record.description,
+            "latitude": record.latitude,
+            "longitude": record.longitude,
+            "address": record.address,
+            "image_url": record.image_url,
+            "status": TaskStatus.PENDING,
+        }
+        for _, record in incident_records
+    ], [index for index, _ in incident_records], results)
+    
+    await db.commit()
+    
+    sos_ids = [results[index].id for index, _ in sos_records if results[index].id is not None]
+    incident_ids = [results[index].id for index, _ in incident_records if results[index].id is not None]
+    sos_list = []
+    if sos_ids:
+        for sos in await db.scalars(select(SOSRequest).options(*SOS_LOAD_OPTIONS).where(SOSRequest.id.in_(sos_ids))):
+            if sos.duplicate_of_id is None:
+                register_primary(sos.id, sos.latitude, sos.longitude)
+                sync_item("sos", sos.id, sos.latitude, sos.longitude, sos.status, "sos")
+            sos_list.append(SOSRequestResponse.model_validate(sos).model_dump(mode='json'))
+    
+    incident_list = []
+    if incident_ids:
+        for incident in await db.scalars(
+            select(IncidentReport).options(*INCIDENT_LOAD_OPTIONS).where(IncidentReport.id.in_(incident_ids))
+        ):
+            sync_item("incident", incident.id, incident.latitude, incident.longitude, incident.status,
+                      incident.incident_type.value)
+            incident_list.append(IncidentReportResponse.model_validate(incident).model_dump(mode='json'))
+    
+    if sos_list or incident_list:
+        await emit_items_ingested(sos_list, incident_list)
+    
+    created = len(sos_ids) + len(incident_ids)
+    return BulkIngestResponse(created=created, failed=len(results) - created, results=results)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.schemas import MapClusterResponse
+from app.identity import UserIdentity
+from app.auth import get_current_admin
+from app.clusters import map_clusters
+
+router = APIRouter(prefix="/map", tags=["Map"])
+
+
+@router.get("/clusters", response_model=MapClusterResponse)
+def get_map_clusters(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(..., ge=0, le=22),
+    current_user: UserIdentity = Depends(get_current_admin)
+):
+    """Get pre-aggregated SOS and incident clusters for a map viewport (Admin only)"""
+    
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bbox must be min_lon,min_lat,max_lon,max_lat"
+        )
+    
+    if not (
+        -180 <= min_lon <= max_lon <= 180
+        and -90 <= min_lat <= max_lat <= 90
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid bbox"
+        )
+    
+    clusters = map_clusters.query(min_lon, min_lat, max_lon, max_lat, zoom)
+    return MapClusterResponse(zoom=min(zoom, map_clusters.max_zoom), clusters=clusters)
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_
 from typing import List
-from app.database import get_db
-from app.models import Message, User, Task, UserRole
+from app.database import get_db, get_read_db
+from app.models import Message, User, Task, UserRole, ArchivedMessage, ArchivedTask
 from app.schemas import MessageCreate, MessageResponse
-from app.auth import get_current_user, get_current_admin
+from app.identity import UserIdentity
+from app.auth import get_current_identity
+from app.pagination import PageParams, paginate_merged
+from app.loaders import MESSAGE_LOAD_OPTIONS, ARCHIVED_MESSAGE_LOAD_OPTIONS
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
@@ -13,7 +16,7 @@ router = APIRouter(prefix="/messages", tags=["Messages"])
 @router.post("/", response_model=MessageResponse)
 def send_message(
     message_data: MessageCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     db: Session = Depends(get_db)
 ):
     """Send a message"""
@@ -77,18 +80,21 @@ def send_message(
 
 @router.get("/", response_model=List[MessageResponse])
 def get_messages(
+    response: Response,
     task_id: int = None,
     contact_id: int = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
-    """Get messages for current user"""
-    
-    query = db.query(Message)
+    """Get messages for current user, oldest first, optionally including archived ones"""
     
     if task_id:
         # Get messages for a specific task
         task = db.query(Task).filter(Task.id == task_id).first()
+        if not task and include_archived:
+            task = db.query(ArchivedTask).filter(ArchivedTask.id == task_id).first()
         if not task:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -113,41 +119,61 @@ def get_messages(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to view messages for this task"
             )
-
-        query = query.filter(Message.task_id == task_id)
+    
+    models = [(Message, MESSAGE_LOAD_OPTIONS)]
+    if include_archived:
+        models.append((ArchivedMessage, ARCHIVED_MESSAGE_LOAD_OPTIONS))
+    
+    sources = []
+    for model, options in models:
+        query = db.query(model).options(*options)
         
-    elif contact_id:
-        # Get conversation between current_user and contact_id (1-on-1 chat)
-        query = query.filter(
-            or_(
-                and_(Message.sender_id == current_user.id, Message.recipient_id == contact_id),
-                and_(Message.sender_id == contact_id, Message.recipient_id == current_user.id)
+        if task_id:
+            query = query.filter(model.task_id == task_id)
+            
+        elif contact_id:
+            # Get conversation between current_user and contact_id (1-on-1 chat)
+            query = query.filter(
+                or_(
+                    and_(model.sender_id == current_user.id, model.recipient_id == contact_id),
+                    and_(model.sender_id == contact_id, model.recipient_id == current_user.id)
+                )
             )
-        )
-    else:
-        # Get all messages for current user (sent or received)
-        query = query.filter(
-            or_(
-                Message.sender_id == current_user.id,
-                Message.recipient_id == current_user.id,
-                Message.is_broadcast == True
+        else:
+            # Get all messages for current user (sent or received)
+            query = query.filter(
+                or_(
+                    model.sender_id == current_user.id,
+                    model.recipient_id == current_user.id,
+                    model.is_broadcast == True
+                )
             )
-        )
+        
+        sources.append((query, model.created_at, model.id))
     
-    messages = query.order_by(Message.created_at.asc()).all()
+    messages = paginate_merged(sources, page, response, descending=False)
     return [MessageResponse.model_validate(msg) for msg in messages]
 
 
 @router.get("/broadcasts", response_model=List[MessageResponse])
 def get_broadcasts(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
-    """Get all broadcast messages"""
+    """Get all broadcast messages, newest first, optionally including archived ones"""
+    
+    models = [(Message, MESSAGE_LOAD_OPTIONS)]
+    if include_archived:
+        models.append((ArchivedMessage, ARCHIVED_MESSAGE_LOAD_OPTIONS))
     
-    broadcasts = db.query(Message).filter(
-        Message.is_broadcast == True
-    ).order_by(Message.created_at.desc()).all()
+    sources = [
+        (db.query(model).options(*options).filter(model.is_broadcast == True), model.created_at, model.id)
+        for model, options in models
+    ]
+    broadcasts = paginate_merged(sources, page, response)
     
     return [MessageResponse.model_validate(msg) for msg in broadcasts]
 
@@ -155,7 +181,7 @@ def get_broadcasts(
 @router.put("/{message_id}/read")
 def mark_message_read(
     message_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     db: Session = Depends(get_db)
 ):
     """Mark message as read"""
@@ -181,8 +207,8 @@ def mark_message_read(
 
 @router.get("/unread/count")
 def get_unread_count(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
     """Get count of unread messages"""
     
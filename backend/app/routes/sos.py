@@ -1,80 +1,137 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
-from app.models import SOSRequest, User, TaskStatus
+from app.database import get_db, get_read_db, get_async_db
+from app.models import SOSRequest, ArchivedSOSRequest, TaskStatus
 from app.schemas import SOSRequestCreate, SOSRequestResponse
-from app.auth import get_current_user, get_current_citizen, get_current_admin
+from app.identity import UserIdentity
+from app.auth import get_current_identity, get_current_citizen, get_current_admin
+from app.pagination import PageParams, paginate_merged
+from app.geo import forget_item, sync_item
+from app.config import settings
 
 router = APIRouter(prefix="/sos", tags=["SOS Requests"])
 
 
-from app.socketio_server import emit_sos_created
+from app.socketio_server import emit_sos_created, emit_sos_linked
+from app.dispatch import auto_dispatch
+from app.dedup import (
+    sos_deduplicator, linked_status_update, register_primary, discard_primary, window_timestamp
+)
+from app.loaders import SOS_LOAD_OPTIONS, ARCHIVED_SOS_LOAD_OPTIONS
+
+async def load_sos_request(db: AsyncSession, sos_id: int) -> SOSRequest:
+    """Reload an SOS request with everything SOSRequestResponse serializes"""
+    # Expire rather than populate_existing, which would re-populate the parent through tasks and drop them
+    db.expire_all()
+    return await db.scalar(
+        select(SOSRequest).options(*SOS_LOAD_OPTIONS).where(SOSRequest.id == sos_id)
+    )
+
 
 @router.post("/", response_model=SOSRequestResponse)
 async def create_sos_request(
     sos_data: SOSRequestCreate,
-    current_user: User = Depends(get_current_citizen),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_citizen),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create new SOS request (Citizen only)"""
     
+    # Link repeats from the same scene to the open SOS already covering it
+    primary = None
+    if settings.SOS_DEDUP_ENABLED:
+        primary = await sos_deduplicator.find_primary(db, sos_data.latitude, sos_data.longitude)
+    
     sos = SOSRequest(
         citizen_id=current_user.id,
         latitude=sos_data.latitude,
         longitude=sos_data.longitude,
         address=sos_data.address,
-        status=TaskStatus.PENDING
+        status=primary.status if primary else TaskStatus.PENDING,
+        duplicate_of_id=primary.id if primary else None
     )
     
     db.add(sos)
-    db.commit()
-    db.refresh(sos)
+    await db.commit()
+    sos = await load_sos_request(db, sos.id)
+    
+    if primary:
+        sos_response = SOSRequestResponse.model_validate(sos)
+        await emit_sos_linked(sos_response.model_dump(mode='json'))
+        return sos_response
+    
+    register_primary(sos.id, sos.latitude, sos.longitude)
+    sync_item("sos", sos.id, sos.latitude, sos.longitude, sos.status, "sos")
     
     # Emit socket event
     sos_response = SOSRequestResponse.model_validate(sos)
     await emit_sos_created(sos_response.model_dump(mode='json'))
     
+    # Hand the SOS straight to the nearest available volunteer
+    if settings.AUTO_DISPATCH_ENABLED:
+        if await auto_dispatch(db, sos):
+            sos = await load_sos_request(db, sos.id)
+            sos_response = SOSRequestResponse.model_validate(sos)
+    
     return sos_response
 
 
 @router.get("/", response_model=List[SOSRequestResponse])
 def get_all_sos_requests(
+    response: Response,
     status_filter: str = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
-    """Get all SOS requests"""
-    
-    query = db.query(SOSRequest)
-    
-    # Citizens can only see their own SOS requests
-    if current_user.role.value == "citizen":
-        query = query.filter(SOSRequest.citizen_id == current_user.id)
+    """Get all SOS requests, newest first, optionally including archived ones"""
     
+    task_status = None
     if status_filter:
         try:
             task_status = TaskStatus(status_filter)
-            query = query.filter(SOSRequest.status == task_status)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid status"
             )
     
-    sos_requests = query.order_by(SOSRequest.created_at.desc()).all()
+    models = [(SOSRequest, SOS_LOAD_OPTIONS)]
+    if include_archived:
+        models.append((ArchivedSOSRequest, ARCHIVED_SOS_LOAD_OPTIONS))
+    
+    sources = []
+    for model, options in models:
+        query = db.query(model).options(*options)
+        
+        # Citizens can only see their own SOS requests
+        if current_user.role.value == "citizen":
+            query = query.filter(model.citizen_id == current_user.id)
+        
+        if task_status:
+            query = query.filter(model.status == task_status)
+        
+        sources.append((query, model.created_at, model.id))
+    
+    sos_requests = paginate_merged(sources, page, response)
     return [SOSRequestResponse.model_validate(sos) for sos in sos_requests]
 
 
 @router.get("/{sos_id}", response_model=SOSRequestResponse)
 def get_sos_request(
     sos_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
-    """Get SOS request by ID"""
+    """Get SOS request by ID, falling back to the archive when asked"""
     
     sos = db.query(SOSRequest).filter(SOSRequest.id == sos_id).first()
+    if not sos and include_archived:
+        sos = db.query(ArchivedSOSRequest).filter(ArchivedSOSRequest.id == sos_id).first()
     if not sos:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -95,7 +152,7 @@ def get_sos_request(
 def update_sos_request(
     sos_id: int,
     sos_data: dict,
-    current_user: User = Depends(get_current_admin),
+    current_user: UserIdentity = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Full update of SOS request (Admin only)"""
@@ -122,10 +179,14 @@ def update_sos_request(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid status"
             )
+        db.execute(linked_status_update([sos.id], sos.status))
     
     db.commit()
     db.refresh(sos)
     
+    if sos.duplicate_of_id is None:
+        sync_item("sos", sos.id, sos.latitude, sos.longitude, sos.status, "sos")
+    
     return SOSRequestResponse.model_validate(sos)
 
 
@@ -133,7 +194,7 @@ def update_sos_request(
 def update_sos_status(
     sos_id: int,
     status_data: dict,
-    current_user: User = Depends(get_current_admin),
+    current_user: UserIdentity = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Update SOS status (Admin only)"""
@@ -153,17 +214,21 @@ def update_sos_status(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid status"
         )
+    db.execute(linked_status_update([sos.id], sos.status))
     
     db.commit()
     db.refresh(sos)
     
+    if sos.duplicate_of_id is None:
+        sync_item("sos", sos.id, sos.latitude, sos.longitude, sos.status, "sos")
+    
     return {"message": "Status updated successfully", "status": sos.status.value}
 
 
 @router.delete("/{sos_id}")
 def delete_sos_request(
     sos_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: UserIdentity = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete SOS request (Admin only)"""
@@ -175,7 +240,24 @@ def delete_sos_request(
             detail="SOS request not found"
         )
     
+    # Detach linked duplicates so they survive the primary as independent requests
+    detached = db.query(
+        SOSRequest.id, SOSRequest.latitude, SOSRequest.longitude, SOSRequest.status, SOSRequest.created_at
+    ).filter(SOSRequest.duplicate_of_id == sos_id).all()
+    db.query(SOSRequest).filter(SOSRequest.duplicate_of_id == sos_id).update(
+        {SOSRequest.duplicate_of_id: None}, synchronize_session=False
+    )
     db.delete(sos)
     db.commit()
     
+    forget_item("sos", sos_id)
+    discard_primary(sos_id)
+    
+    # Former duplicates were never indexed; they are pending work and merge targets now
+    for item_id, latitude, longitude, item_status, created_at in detached:
+        sync_item("sos", item_id, latitude, longitude, item_status, "sos")
+        registered_at = window_timestamp(created_at, item_status)
+        if registered_at is not None:
+            register_primary(item_id, latitude, longitude, registered_at)
+    
     return {"message": "SOS request deleted successfully"}
@@ -0,0 +1,31 @@
+import asyncio
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from app.identity import UserIdentity
+from app.auth import get_current_admin
+from app.database import pool_stats
+from app.hashing import password_hasher
+from app.archive import archive_closed_items
+
+router = APIRouter(prefix="/system", tags=["System"])
+
+
+@router.get("/pool")
+def get_pool_stats(current_user: UserIdentity = Depends(get_current_admin)):
+    """Get database connection pool statistics (Admin only)"""
+    return pool_stats()
+
+
+@router.get("/password-hashing")
+def get_password_hashing_stats(current_user: UserIdentity = Depends(get_current_admin)):
+    """Get password hashing pool queue and latency statistics (Admin only)"""
+    return password_hasher.stats()
+
+
+@router.post("/archive")
+async def run_archival(
+    older_than_days: Optional[float] = Query(None, ge=0),
+    current_user: UserIdentity = Depends(get_current_admin)
+):
+    """Move closed records to the archive tables now and return the rows moved per table (Admin only)"""
+    return await asyncio.to_thread(archive_closed_items, older_than_days)
@@ -1,45 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+import numpy as np
+from typing import List, Optional
 from datetime import datetime
-from app.database import get_db
-from app.models import Task, User, SOSRequest, IncidentReport, TaskStatus, UserRole, VolunteerStatus
-from app.schemas import TaskCreate, TaskResponse, TaskUpdate
-from app.auth import get_current_user, get_current_admin, get_current_volunteer
-from app.socketio_server import emit_task_assigned, emit_task_updated
-import math
+from app.database import get_db, get_read_db, get_async_db
+from app.models import (
+    Task, User, SOSRequest, IncidentReport, TaskStatus, UserRole, VolunteerStatus,
+    ArchivedTask, ArchivedSOSRequest, ArchivedIncidentReport
+)
+from app.schemas import TaskCreate, TaskResponse, TaskUpdate, BatchAssignmentResponse
+from app.identity import UserIdentity
+from app.auth import get_current_identity, get_current_admin, get_current_volunteer
+from app.pagination import PageParams, paginate_merged
+from app.socketio_server import emit_task_assigned, emit_tasks_assigned, emit_task_updated
+from app.geo import pending_index, sync_item
+from app.dispatch import ACTIVE_TASK_STATUSES, solve_assignment, volunteer_registry
+from app.locations import live_locations
+from app.dedup import linked_status_update
+from app.loaders import TASK_LOAD_OPTIONS, ARCHIVED_TASK_LOAD_OPTIONS
+from app.deltas import versioned_delta
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two coordinates in km using Haversine formula"""
-    R = 6371  # Earth's radius in km
-    
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
+async def load_task(db: AsyncSession, task_id: int) -> Task:
+    """Reload a task with everything TaskResponse serializes"""
+    return await db.scalar(
+        select(Task).options(*TASK_LOAD_OPTIONS).where(Task.id == task_id)
+        .execution_options(populate_existing=True)
+    )
 
 
 @router.post("/", response_model=TaskResponse)
 async def create_task(
     task_data: TaskCreate,
-    current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create and assign task to volunteer (Admin only)"""
     
     # Verify volunteer exists
-    volunteer = db.query(User).filter(
+    volunteer = await db.scalar(select(User).where(
         User.id == task_data.volunteer_id,
         User.role == UserRole.VOLUNTEER
-    ).first()
+    ))
     
     if not volunteer:
         raise HTTPException(
@@ -55,18 +62,19 @@ async def create_task(
         )
     
     if task_data.sos_request_id:
-        sos = db.query(SOSRequest).filter(SOSRequest.id == task_data.sos_request_id).first()
+        sos = await db.scalar(select(SOSRequest).where(SOSRequest.id == task_data.sos_request_id))
         if not sos:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="SOS request not found"
             )
         sos.status = TaskStatus.ASSIGNED
+        await db.execute(linked_status_update([sos.id], sos.status))
     
     if task_data.incident_report_id:
-        incident = db.query(IncidentReport).filter(
+        incident = await db.scalar(select(IncidentReport).where(
             IncidentReport.id == task_data.incident_report_id
-        ).first()
+        ))
         if not incident:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -84,8 +92,15 @@ async def create_task(
     )
     
     db.add(task)
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    task = await load_task(db, task.id)
+    
+    volunteer_registry.sync_task(task.id, task.volunteer_id, task.status)
+    if task_data.sos_request_id:
+        sync_item("sos", sos.id, sos.latitude, sos.longitude, sos.status, "sos")
+    if task_data.incident_report_id:
+        sync_item("incident", incident.id, incident.latitude, incident.longitude, incident.status,
+                  incident.incident_type.value)
     
     # Emit socket event
     task_response = TaskResponse.model_validate(task)
@@ -94,108 +109,245 @@ async def create_task(
     return task_response
 
 
+@router.post("/assign-batch", response_model=BatchAssignmentResponse)
+async def assign_pending_batch(
+    current_user: UserIdentity = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Optimally assign every pending SOS and incident to online volunteers (Admin only)"""
+    
+    sos_rows = await db.execute(
+        select(SOSRequest.id, SOSRequest.latitude, SOSRequest.longitude)
+        .where(SOSRequest.status == TaskStatus.PENDING, SOSRequest.duplicate_of_id.is_(None))
+    )
+    incident_rows = await db.execute(
+        select(IncidentReport.id, IncidentReport.latitude, IncidentReport.longitude)
+        .where(IncidentReport.status == TaskStatus.PENDING)
+    )
+    items = [("sos", item_id, lat, lon) for item_id, lat, lon in sos_rows] + [
+        ("incident", item_id, lat, lon) for item_id, lat, lon in incident_rows
+    ]
+    
+    volunteers = (await db.execute(
+        select(User.id, User.latitude, User.longitude).where(
+            User.role == UserRole.VOLUNTEER,
+            User.volunteer_status == VolunteerStatus.ONLINE,
+            User.latitude.isnot(None),
+            User.longitude.isnot(None)
+        )
+    )).all()
+    
+    active_loads = dict((await db.execute(
+        select(Task.volunteer_id, func.count(Task.id))
+        .where(Task.status.in_(ACTIVE_TASK_STATUSES))
+        .group_by(Task.volunteer_id)
+    )).all())
+    
+    # The solver is CPU-bound; keep it off the event loop
+    matches = await asyncio.to_thread(
+        solve_assignment,
+        np.array([(lat, lon) for _, _, lat, lon in items], dtype=float).reshape(-1, 2),
+        np.array([(lat, lon) for _, lat, lon in volunteers], dtype=float).reshape(-1, 2),
+        np.array([active_loads.get(v.id, 0) for v in volunteers], dtype=int)
+    )
+    
+    if not matches:
+        return BatchAssignmentResponse(assigned=0, unassigned=len(items), total_distance_km=0)
+    
+    # Flip the matched items to ASSIGNED only while they are still PENDING; anything a concurrent
+    # create_task or auto-dispatch took in the meantime drops out of the batch
+    sos_ids = [items[item_index][1] for item_index, _, _ in matches if items[item_index][0] == "sos"]
+    incident_ids = [items[item_index][1] for item_index, _, _ in matches if items[item_index][0] == "incident"]
+    claimed = set()
+    if sos_ids:
+        claimed.update(("sos", item_id) for item_id in await db.scalars(
+            update(SOSRequest)
+            .where(SOSRequest.id.in_(sos_ids), SOSRequest.status == TaskStatus.PENDING)
+            .values(status=TaskStatus.ASSIGNED)
+            .returning(SOSRequest.id),
+            execution_options={"synchronize_session": False}
+        ))
+    if incident_ids:
+        claimed.update(("incident", item_id) for item_id in await db.scalars(
+            update(IncidentReport)
+            .where(IncidentReport.id.in_(incident_ids), IncidentReport.status == TaskStatus.PENDING)
+            .values(status=TaskStatus.ASSIGNED, version=IncidentReport.version + 1)
+            .returning(IncidentReport.id),
+            execution_options={"synchronize_session": False}
+        ))
+    matches = [match for match in matches if items[match[0]][:2] in claimed]
+    if not matches:
+        await db.rollback()
+        return BatchAssignmentResponse(assigned=0, unassigned=len(items), total_distance_km=0)
+    
+    claimed_sos_ids = [item_id for kind, item_id in claimed if kind == "sos"]
+    if claimed_sos_ids:
+        await db.execute(linked_status_update(claimed_sos_ids, TaskStatus.ASSIGNED))
+    
+    # Create every task in the same transaction as the status flips
+    tasks = []
+    for item_index, volunteer_index, distance in matches:
+        kind, item_id, _, _ = items[item_index]
+        tasks.append(Task(
+            volunteer_id=volunteers[volunteer_index].id,
+            sos_request_id=item_id if kind == "sos" else None,
+            incident_report_id=item_id if kind == "incident" else None,
+            status=TaskStatus.ASSIGNED,
+            notes=f"Batch-assigned ({distance:.2f} km away)"
+        ))
+    db.add_all(tasks)
+    await db.commit()
+    
+    task_ids = [task.id for task in tasks]
+    for task in tasks:
+        volunteer_registry.sync_task(task.id, task.volunteer_id, TaskStatus.ASSIGNED)
+    for item_index, _, _ in matches:
+        kind, item_id, lat, lon = items[item_index]
+        sync_item(kind, item_id, lat, lon, TaskStatus.ASSIGNED)
+    
+    # Emit socket events as one batch
+    created = (await db.scalars(
+        select(Task).options(*TASK_LOAD_OPTIONS).where(Task.id.in_(task_ids))
+        .execution_options(populate_existing=True)
+    )).all()
+    await emit_tasks_assigned([TaskResponse.model_validate(task).model_dump(mode='json') for task in created])
+    
+    return BatchAssignmentResponse(
+        assigned=len(matches),
+        unassigned=len(items) - len(matches),
+        total_distance_km=round(sum(distance for _, _, distance in matches), 3),
+        task_ids=task_ids
+    )
+
+
 @router.get("/", response_model=List[TaskResponse])
 def get_tasks(
+    response: Response,
     status_filter: str = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
-    """Get tasks based on user role"""
-    
-    query = db.query(Task)
-    
-    # Volunteers only see their own tasks
-    if current_user.role == UserRole.VOLUNTEER:
-        query = query.filter(Task.volunteer_id == current_user.id)
-    
-    # Citizens see tasks related to their SOS/incidents
-    if current_user.role == UserRole.CITIZEN:
-        sos_ids = [s.id for s in current_user.sos_requests]
-        incident_ids = [i.id for i in current_user.incident_reports]
-        
-        query = query.filter(
-            (Task.sos_request_id.in_(sos_ids)) | (Task.incident_report_id.in_(incident_ids))
-        )
+    """Get tasks based on user role, most recently assigned first, optionally including archived ones"""
     
+    task_status = None
     if status_filter:
         try:
             task_status = TaskStatus(status_filter)
-            query = query.filter(Task.status == task_status)
         except ValueError:
             pass
     
-    tasks = query.order_by(Task.assigned_at.desc()).all()
+    # Archived tasks always sit next to their archived SOS/incident
+    models = [(Task, SOSRequest, IncidentReport, TASK_LOAD_OPTIONS)]
+    if include_archived:
+        models.append((ArchivedTask, ArchivedSOSRequest, ArchivedIncidentReport, ARCHIVED_TASK_LOAD_OPTIONS))
+    
+    sources = []
+    for model, sos_model, incident_model, options in models:
+        query = db.query(model).options(*options)
+        
+        # Volunteers only see their own tasks
+        if current_user.role == UserRole.VOLUNTEER:
+            query = query.filter(model.volunteer_id == current_user.id)
+        
+        # Citizens see tasks related to their SOS/incidents
+        if current_user.role == UserRole.CITIZEN:
+            sos_ids = select(sos_model.id).where(sos_model.citizen_id == current_user.id)
+            incident_ids = select(incident_model.id).where(incident_model.citizen_id == current_user.id)
+            
+            query = query.filter(
+                (model.sos_request_id.in_(sos_ids)) | (model.incident_report_id.in_(incident_ids))
+            )
+        
+        if task_status:
+            query = query.filter(model.status == task_status)
+        
+        sources.append((query, model.assigned_at, model.id))
+    
+    tasks = paginate_merged(sources, page, response)
     return [TaskResponse.model_validate(task) for task in tasks]
 
 
 @router.get("/nearby", response_model=List[TaskResponse])
 def get_nearby_tasks(
-    current_user: User = Depends(get_current_volunteer),
-    db: Session = Depends(get_db)
+    radius_km: float = Query(50, gt=0, le=500),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    item_type: Optional[str] = Query(None, alias="type", pattern="^(sos|incident)$"),
+    current_user: UserIdentity = Depends(get_current_volunteer),
+    db: Session = Depends(get_read_db)
 ):
-    """Get nearby unassigned tasks for volunteers"""
+    """Get nearby unassigned tasks for volunteers, nearest first"""
+    
+    live = live_locations.get(current_user.id)
+    if live is not None:
+        latitude, longitude = live.latitude, live.longitude
+    else:
+        latitude, longitude = db.query(User.latitude, User.longitude).filter(User.id == current_user.id).one()
     
-    if not current_user.latitude or not current_user.longitude:
+    if not latitude or not longitude:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Update your location first"
         )
     
-    # Get pending SOS and incidents
-    pending_sos = db.query(SOSRequest).filter(
-        SOSRequest.status == TaskStatus.PENDING
-    ).all()
-    
-    pending_incidents = db.query(IncidentReport).filter(
-        IncidentReport.status == TaskStatus.PENDING
-    ).all()
+    # Look up pending SOS and incidents within the radius from the spatial index
+    nearby = pending_index.within_radius(latitude, longitude, radius_km)
+    if item_type:
+        nearby = [item for item in nearby if item[0][0] == item_type]
+    nearby = nearby[offset:offset + limit]
+    
+    sos_ids = [item_id for (kind, item_id), _ in nearby if kind == "sos"]
+    incident_ids = [item_id for (kind, item_id), _ in nearby if kind == "incident"]
+    
+    pending_sos = {}
+    if sos_ids:
+        pending_sos = {
+            sos.id: sos for sos in db.query(SOSRequest).options(
+                selectinload(SOSRequest.citizen)
+            ).filter(
+                SOSRequest.id.in_(sos_ids),
+                SOSRequest.status == TaskStatus.PENDING
+            )
+        }
+    
+    pending_incidents = {}
+    if incident_ids:
+        pending_incidents = {
+            incident.id: incident for incident in db.query(IncidentReport).options(
+                selectinload(IncidentReport.citizen)
+            ).filter(
+                IncidentReport.id.in_(incident_ids),
+                IncidentReport.status == TaskStatus.PENDING
+            )
+        }
     
-    # Calculate distances and create dummy tasks for display
+    # Create dummy tasks for display, nearest first
     nearby_tasks = []
     
-    for sos in pending_sos:
-        distance = calculate_distance(
-            current_user.latitude, current_user.longitude,
-            sos.latitude, sos.longitude
-        )
-        if distance <= 50:  # Within 50km
-            task_data = {
-                "id": 0,
-                "volunteer_id": None,
-                "sos_request_id": sos.id,
-                "incident_report_id": None,
-                "status": TaskStatus.PENDING,
-                "assigned_at": sos.created_at,
-                "accepted_at": None,
-                "completed_at": None,
-                "notes": f"Distance: {distance:.2f} km",
-                "volunteer": None,
-                "sos_request": sos,
-                "incident_report": None
-            }
-            nearby_tasks.append(task_data)
-    
-    for incident in pending_incidents:
-        distance = calculate_distance(
-            current_user.latitude, current_user.longitude,
-            incident.latitude, incident.longitude
-        )
-        if distance <= 50:  # Within 50km
-            task_data = {
-                "id": 0,
-                "volunteer_id": None,
-                "sos_request_id": None,
-                "incident_report_id": incident.id,
-                "status": TaskStatus.PENDING,
-                "assigned_at": incident.created_at,
-                "accepted_at": None,
-                "completed_at": None,
-                "notes": f"Distance: {distance:.2f} km",
-                "volunteer": None,
-                "sos_request": None,
-                "incident_report": incident
-            }
-            nearby_tasks.append(task_data)
+    for (kind, item_id), distance in nearby:
+        sos = pending_sos.get(item_id) if kind == "sos" else None
+        incident = pending_incidents.get(item_id) if kind == "incident" else None
+        if sos is None and incident is None:
+            continue
+        
+        task_data = {
+            "id": 0,
+            "volunteer_id": None,
+            "sos_request_id": sos.id if sos else None,
+            "incident_report_id": incident.id if incident else None,
+            "status": TaskStatus.PENDING,
+            "assigned_at": (sos or incident).created_at,
+            "accepted_at": None,
+            "completed_at": None,
+            "notes": None,
+            "distance_km": round(distance, 3),
+            "volunteer": None,
+            "sos_request": sos,
+            "incident_report": incident
+        }
+        nearby_tasks.append(task_data)
     
     return nearby_tasks
 
@@ -203,12 +355,15 @@ def get_nearby_tasks(
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
     task_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
-    """Get task by ID"""
+    """Get task by ID, falling back to the archive when asked"""
     
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = db.query(Task).options(*TASK_LOAD_OPTIONS).filter(Task.id == task_id).first()
+    if not task and include_archived:
+        task = db.query(ArchivedTask).options(*ARCHIVED_TASK_LOAD_OPTIONS).filter(ArchivedTask.id == task_id).first()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -243,12 +398,12 @@ def get_task(
 async def update_task(
     task_id: int,
     update_data: TaskUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update task status and notes"""
     
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = await db.scalar(select(Task).options(*TASK_LOAD_OPTIONS).where(Task.id == task_id))
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -269,6 +424,8 @@ async def update_task(
             detail="Citizens cannot update tasks"
         )
     
+    before = TaskResponse.model_validate(task).model_dump(mode='json')
+    
     if update_data.status:
         task.status = update_data.status
         
@@ -281,16 +438,26 @@ async def update_task(
         # Update related SOS/incident status
         if task.sos_request:
             task.sos_request.status = update_data.status
+            await db.execute(linked_status_update([task.sos_request.id], update_data.status))
         if task.incident_report:
             task.incident_report.status = update_data.status
     
     if update_data.notes:
         task.notes = update_data.notes
     
-    db.commit()
-    db.refresh(task)
+    await db.commit()
+    task = await load_task(db, task.id)
     
-    # Emit socket event
+    volunteer_registry.sync_task(task.id, task.volunteer_id, task.status)
+    if task.sos_request:
+        sos = task.sos_request
+        sync_item("sos", sos.id, sos.latitude, sos.longitude, sos.status, "sos")
+    if task.incident_report:
+        incident = task.incident_report
+        sync_item("incident", incident.id, incident.latitude, incident.longitude, incident.status,
+                  incident.incident_type.value)
+    
+    # Emit only what changed, stamped with the task version
     task_response = TaskResponse.model_validate(task)
     user_ids = [task.volunteer_id]
     if task.sos_request:
@@ -298,7 +465,9 @@ async def update_task(
     if task.incident_report:
         user_ids.append(task.incident_report.citizen_id)
         
-    await emit_task_updated(task_response.model_dump(mode='json'), user_ids)
+    delta = versioned_delta(before, task_response.model_dump(mode='json'))
+    if delta["version"] != delta["base_version"]:
+        await emit_task_updated(delta, user_ids)
     
     return task_response
 
@@ -306,7 +475,7 @@ async def update_task(
 @router.delete("/{task_id}")
 def delete_task(
     task_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: UserIdentity = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete task (Admin only)"""
@@ -321,4 +490,6 @@ def delete_task(
     db.delete(task)
     db.commit()
     
+    volunteer_registry.sync_task(task_id, None, TaskStatus.CANCELLED)
+    
     return {"message": "Task deleted successfully"}
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
+from app.database import get_db, get_read_db, get_async_db
 from app.models import User, UserRole, VolunteerStatus
 from app.schemas import UserResponse, UserUpdate, UserLocationUpdate
-from app.auth import get_current_user, get_current_admin
+from app.identity import UserIdentity
+from app.auth import get_current_user, get_current_identity, get_current_admin
+from app.pagination import PageParams, paginate
+from app.dispatch import volunteer_registry
+from app.locations import live_locations
+from app.socketio_server import emit_user_location_update, move_to_geo_room
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -16,10 +22,10 @@ def get_current_user_profile(current_user: User = Depends(get_current_user)):
 
 
 @router.put("/me", response_model=UserResponse)
-def update_current_user(
+async def update_current_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user profile"""
     
@@ -38,17 +44,17 @@ def update_current_user(
     if user_update.volunteer_status is not None and current_user.role == UserRole.VOLUNTEER:
         current_user.volunteer_status = user_update.volunteer_status
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    volunteer_registry.sync_volunteer(current_user)
     
     return UserResponse.model_validate(current_user)
 
 
 @router.put("/me/location", response_model=UserResponse)
-def update_user_location(
+async def update_user_location(
     location: UserLocationUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user location"""
     
@@ -57,17 +63,22 @@ def update_user_location(
     if location.address:
         current_user.address = location.address
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    
+    record = live_locations.update(current_user.id, location.latitude, location.longitude, location.address)
+    record.dirty = False
+    volunteer_registry.sync_volunteer(current_user)
+    await move_to_geo_room(current_user.id, location.latitude, location.longitude)
+    await emit_user_location_update(record.to_dict())
     
     return UserResponse.model_validate(current_user)
 
 
 @router.put("/me/volunteer-status", response_model=UserResponse)
-def update_volunteer_status(
+async def update_volunteer_status(
     status_update: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update volunteer online/offline status"""
     
@@ -85,19 +96,21 @@ def update_volunteer_status(
         )
     
     current_user.volunteer_status = VolunteerStatus(new_status)
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    volunteer_registry.sync_volunteer(current_user)
     
     return UserResponse.model_validate(current_user)
 
 
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
+    response: Response,
     role: str = None,
-    current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
-    """Get all users (Admin only)"""
+    """Get all users, newest first (Admin only)"""
     
     query = db.query(User)
     
@@ -111,14 +124,14 @@ def get_all_users(
                 detail="Invalid role"
             )
     
-    users = query.all()
+    users = paginate(query, User.created_at, User.id, page, response)
     return [UserResponse.model_validate(user) for user in users]
 
 
 @router.get("/volunteers/online", response_model=List[UserResponse])
 def get_online_volunteers(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_identity),
+    db: Session = Depends(get_read_db)
 ):
     """Get all online volunteers"""
     
@@ -133,8 +146,8 @@ def get_online_volunteers(
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user_by_id(
     user_id: int,
-    current_user: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    current_user: UserIdentity = Depends(get_current_admin),
+    db: Session = Depends(get_read_db)
 ):
     """Get user by ID (Admin only)"""
     
@@ -152,7 +165,7 @@ def get_user_by_id(
 def admin_update_user(
     user_id: int,
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_admin),
+    current_user: UserIdentity = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Update any user (Admin only)"""
@@ -185,6 +198,7 @@ def admin_update_user(
     
     db.commit()
     db.refresh(user)
+    volunteer_registry.sync_volunteer(user)
     
     return UserResponse.model_validate(user)
 
@@ -192,7 +206,7 @@ def admin_update_user(
 @router.delete("/{user_id}")
 def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: UserIdentity = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete user (Admin only)"""
@@ -212,5 +226,7 @@ def delete_user(
     
     db.delete(user)
     db.commit()
+    volunteer_registry.remove_volunteer(user_id)
+    live_locations.discard(user_id)
     
     return {"message": "User deleted successfully"}
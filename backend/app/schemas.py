@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Dict, Literal, Optional, List, Union
+from typing_extensions import Annotated
 from datetime import datetime
 from app.models import UserRole, TaskStatus, VolunteerStatus, IncidentType
 
@@ -58,6 +59,16 @@ class Token(BaseModel):
     user: UserResponse
 
 
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+
+class RefreshedToken(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
+
 class TokenData(BaseModel):
     user_id: Optional[int] = None
     role: Optional[UserRole] = None
@@ -77,6 +88,7 @@ class SOSRequestResponse(BaseModel):
     longitude: float
     address: Optional[str] = None
     status: TaskStatus
+    duplicate_of_id: Optional[int] = None
     created_at: datetime
     citizen: UserResponse
     tasks: List['TaskResponse'] = []
@@ -115,6 +127,7 @@ class IncidentReportResponse(BaseModel):
     image_url: Optional[str] = None
     status: TaskStatus
     created_at: datetime
+    version: int
     citizen: UserResponse
     tasks: List['TaskResponse'] = []
     
@@ -177,6 +190,8 @@ class TaskResponse(BaseModel):
     accepted_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     notes: Optional[str] = None
+    distance_km: Optional[float] = None
+    version: int = 0  # 0 for the unassigned placeholders from /tasks/nearby
     volunteer: Optional[UserResponse] = None
     sos_request: Optional[TaskSOSData] = None
     incident_report: Optional[TaskIncidentData] = None
@@ -185,6 +200,41 @@ class TaskResponse(BaseModel):
         from_attributes = True
 
 
+class BatchAssignmentResponse(BaseModel):
+    assigned: int
+    unassigned: int
+    total_distance_km: float
+    task_ids: List[int] = []
+
+
+# ========== Bulk Ingest Schemas ==========
+class BulkSOSRecord(SOSRequestCreate):
+    type: Literal["sos"]
+    citizen_id: Optional[int] = None  # Defaults to the ingesting account
+
+
+class BulkIncidentRecord(IncidentReportCreate):
+    type: Literal["incident"]
+    citizen_id: Optional[int] = None  # Defaults to the ingesting account
+
+
+BulkRecord = Annotated[Union[BulkSOSRecord, BulkIncidentRecord], Field(discriminator="type")]
+
+
+class BulkIngestResult(BaseModel):
+    index: int
+    type: Optional[str] = None
+    id: Optional[int] = None
+    duplicate_of_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkIngestResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkIngestResult]
+
+
 # ========== Message Schemas ==========
 class MessageCreate(BaseModel):
     recipient_id: Optional[int] = None
@@ -254,6 +304,20 @@ class DashboardStats(BaseModel):
     resolved_tasks: int
 
 
+# ========== Map Schemas ==========
+class MapCluster(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    by_status: Dict[str, int]
+    by_type: Dict[str, int]
+
+
+class MapClusterResponse(BaseModel):
+    zoom: int
+    clusters: List[MapCluster]
+
+
 # Resolve forward references for Pydantic models
 SOSRequestResponse.model_rebuild()
 IncidentReportResponse.model_rebuild()
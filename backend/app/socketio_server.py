@@ -1,58 +1,208 @@
+import asyncio
+import logging
 import socketio
-from typing import Dict, Set
+from fastapi import HTTPException
+from typing import Dict, List, Optional
+from app.auth import decode_token
+from app.batching import EventBatcher, parse_room_windows
+from app.config import settings
+from app.database import SessionLocal
+from app.geo import GridIndex
+from app.identity import UserIdentity, identity_cache
+from app.locations import live_locations
+from app.logs import get_logger, log_event
+from app.models import User, UserRole
+from app.presence import create_presence
+
+# Client managers by message queue URL scheme; workers sharing a queue reach each other's sockets
+CLIENT_MANAGERS = {
+    'redis': lambda url: socketio.AsyncRedisManager(url, channel=settings.SOCKETIO_CHANNEL),
+    'rediss': lambda url: socketio.AsyncRedisManager(url, channel=settings.SOCKETIO_CHANNEL),
+}
+
+
+def client_manager(url: str) -> Optional[socketio.AsyncManager]:
+    """Pub/sub client manager for a message queue URL, or None for a single process"""
+    if not url:
+        return None
+    scheme = url.split('://', 1)[0]
+    if scheme not in CLIENT_MANAGERS:
+        raise ValueError(f"Unsupported SOCKETIO_MESSAGE_QUEUE scheme: {scheme}")
+    return CLIENT_MANAGERS[scheme](url)
+
 
 # Create Socket.IO server
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins='*',
-    logger=True,
-    engineio_logger=True
+    client_manager=client_manager(settings.SOCKETIO_MESSAGE_QUEUE),
+    # Library logs go through the app's queue handler at SOCKETIO_LOG_LEVEL
+    logger=logging.getLogger('socketio.server'),
+    engineio_logger=logging.getLogger('engineio.server')
 )
 
-# Store connected users: {user_id: set of sid}
-connected_users: Dict[int, Set[str]] = {}
+logger = get_logger(__name__)
+
+# Coalesces task, location and volunteer status updates into one frame per room per tick
+event_batcher = EventBatcher(
+    sio.emit,
+    default_window=settings.SOCKET_BATCH_WINDOW_MS / 1000,
+    room_windows=parse_room_windows(settings.SOCKET_BATCH_ROOM_WINDOWS),
+    enabled=settings.SOCKET_BATCHING_ENABLED,
+)
+
+# Coarse grid naming the region rooms ("geo:<row>:<col>") volunteers sit in
+geo_grid = GridIndex(cell_size=settings.GEO_ROOM_CELL_DEGREES)
+
+# Connected users and the region room each volunteer follows, shared across workers
+presence = create_presence(settings.SOCKETIO_MESSAGE_QUEUE, settings.PRESENCE_TTL_SECONDS)
+
+
+def user_room(user_id: int) -> str:
+    """Room every authenticated socket of a user joins"""
+    return f"user:{user_id}"
+
+
+def local_user_sids(user_id: int) -> List[str]:
+    """A user's sockets connected to this process"""
+    return [sid for sid, _ in sio.manager.get_participants('/', user_room(user_id))]
+
+
+def geo_room_for(latitude: float, longitude: float) -> str:
+    row, col = geo_grid.cell_for(latitude, longitude)
+    return f"geo:{row}:{col}"
+
 
-# Store user sessions: {sid: user_id}
-user_sessions: Dict[str, int] = {}
+def geo_rooms_within(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    return [f"geo:{row}:{col}" for row, col in geo_grid.cells_within(latitude, longitude, radius_km)]
+
+
+def _load_socket_user(user_id: int):
+    db = SessionLocal()
+    try:
+        return db.query(User.role, User.is_active, User.latitude, User.longitude).filter(User.id == user_id).first()
+    finally:
+        db.close()
+
+
+def _load_socket_identity(user_id: int) -> Optional[UserIdentity]:
+    db = SessionLocal()
+    try:
+        row = db.query(User.id, User.role, User.is_active).filter(User.id == user_id).first()
+    finally:
+        db.close()
+    if row is None:
+        return None
+    identity = UserIdentity(*row)
+    identity_cache.put(identity)
+    return identity
+
+
+def can_join(session: dict, room: str) -> bool:
+    """Whether a socket may join (or send to) a room itself; user and region rooms are server-managed"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return False
+    if room == 'admin':
+        return session.get('role') == UserRole.ADMIN
+    if room.startswith('user:'):
+        return room == user_room(user_id)
+    return not room.startswith('geo:')
+
+
+async def move_to_geo_room(user_id: int, latitude: float, longitude: float):
+    """Move a volunteer's sockets, on any worker, into the region room for their location"""
+    previous = await presence.region(user_id)
+    if previous is None:
+        return
+    
+    room = geo_room_for(latitude, longitude)
+    if previous == room:
+        return
+    
+    await presence.set_region(user_id, room)
+    # Room changes for sockets held by other workers travel over the message queue
+    await asyncio.gather(*(
+        _switch_room(sid, previous, room) for sid in await presence.sids(user_id)
+    ))
+
+
+async def _switch_room(sid: str, previous: Optional[str], room: str):
+    if previous:
+        await sio.leave_room(sid, previous)
+    await sio.enter_room(sid, room)
+
+
+async def _authenticate_socket(sid: str, token: Optional[str]) -> bool:
+    """Bind a socket to the active user named by a verified access token"""
+    try:
+        token_data = decode_token(token or "")
+    except HTTPException:
+        return False
+    
+    user_id = token_data.user_id
+    session = await sio.get_session(sid)
+    if session.get('user_id') not in (None, user_id):
+        return False
+    
+    user = await asyncio.to_thread(_load_socket_user, user_id)
+    if user is None or not user.is_active:
+        return False
+    
+    await sio.save_session(sid, {'user_id': user_id, 'role': user.role})
+    await sio.enter_room(sid, user_room(user_id))
+    await presence.add(user_id, sid)
+    
+    await sio.emit('authenticated', {'user_id': user_id}, room=sid)
+    log_event(logger, 'socket_authenticated', user_id=user_id, sid=sid)
+    
+    # Volunteers automatically join the region room for their last known location
+    region = await presence.region(user_id)
+    if region is not None:
+        if region:
+            await sio.enter_room(sid, region)
+        return True
+    
+    if user.role != UserRole.VOLUNTEER:
+        return True
+    
+    await presence.set_region(user_id, "")
+    live = live_locations.get(user_id)
+    if live is not None:
+        await move_to_geo_room(user_id, live.latitude, live.longitude)
+    elif user.latitude is not None and user.longitude is not None:
+        await move_to_geo_room(user_id, user.latitude, user.longitude)
+    return True
 
 
 @sio.event
-async def connect(sid, environ):
-    """Handle client connection"""
-    print(f"Client connected: {sid}")
+async def connect(sid, environ, auth=None):
+    """Handle client connection, authenticating it when the client sends {token}"""
+    log_event(logger, 'socket_connected', logging.DEBUG, sid=sid)
     await sio.emit('connection_established', {'sid': sid}, room=sid)
+    
+    token = auth.get('token') if isinstance(auth, dict) else None
+    if token and not await _authenticate_socket(sid, token):
+        raise socketio.exceptions.ConnectionRefusedError('Invalid token')
 
 
 @sio.event
 async def disconnect(sid):
     """Handle client disconnection"""
-    print(f"Client disconnected: {sid}")
+    log_event(logger, 'socket_disconnected', logging.DEBUG, sid=sid)
     
-    # Remove from sessions
-    if sid in user_sessions:
-        user_id = user_sessions[sid]
-        del user_sessions[sid]
-        
-        # Remove from connected users
-        if user_id in connected_users:
-            connected_users[user_id].discard(sid)
-            if not connected_users[user_id]:
-                del connected_users[user_id]
+    # The volunteer's region is forgotten once their last socket on any worker is gone
+    user_id = (await sio.get_session(sid)).get('user_id')
+    if user_id:
+        await presence.remove(user_id, sid)
 
 
 @sio.event
 async def authenticate(sid, data):
-    """Authenticate user session"""
-    user_id = data.get('user_id')
-    if user_id:
-        user_sessions[sid] = user_id
-        
-        if user_id not in connected_users:
-            connected_users[user_id] = set()
-        connected_users[user_id].add(sid)
-        
-        await sio.emit('authenticated', {'user_id': user_id}, room=sid)
-        print(f"User {user_id} authenticated with session {sid}")
+    """Authenticate a connected socket with an access token ({token})"""
+    token = data.get('token') if isinstance(data, dict) else None
+    if not await _authenticate_socket(sid, token):
+        await sio.emit('error', {'message': 'Invalid token'}, room=sid)
 
 
 @sio.event
@@ -60,9 +210,12 @@ async def join_room(sid, data):
     """Join a specific room (e.g., task room, admin room)"""
     room = data.get('room')
     if room:
-        sio.enter_room(sid, room)
+        if not can_join(await sio.get_session(sid), room):
+            await sio.emit('error', {'message': 'Cannot join room'}, room=sid)
+            return
+        await sio.enter_room(sid, room)
         await sio.emit('joined_room', {'room': room}, room=sid)
-        print(f"Session {sid} joined room: {room}")
+        log_event(logger, 'room_joined', logging.DEBUG, sid=sid, room=room)
 
 
 @sio.event
@@ -70,7 +223,7 @@ async def leave_room(sid, data):
     """Leave a specific room"""
     room = data.get('room')
     if room:
-        sio.leave_room(sid, room)
+        await sio.leave_room(sid, room)
         await sio.emit('left_room', {'room': room}, room=sid)
 
 
@@ -81,64 +234,136 @@ async def send_message(sid, data):
     room = data.get('room')
     message = data.get('message')
     
-    if recipient_id and recipient_id in connected_users:
-        # Send to specific user
-        for user_sid in connected_users[recipient_id]:
-            await sio.emit('new_message', message, room=user_sid)
+    session = await sio.get_session(sid)
+    if not session.get('user_id') or (room and not recipient_id and not can_join(session, room)):
+        await sio.emit('error', {'message': 'Not allowed'}, room=sid)
+        return
+    
+    if recipient_id:
+        # Send to every socket of a specific user
+        await sio.emit('new_message', message, room=user_room(recipient_id))
     elif room:
         # Send to room
         await sio.emit('new_message', message, room=room)
 
 
+@sio.event
+async def update_location(sid, data):
+    """Stream the authenticated user's current position (only sockets verified by token)"""
+    user_id = (await sio.get_session(sid)).get('user_id')
+    if not user_id:
+        await sio.emit('error', {'message': 'Not authenticated'}, room=sid)
+        return
+    
+    try:
+        latitude = float(data['latitude'])
+        longitude = float(data['longitude'])
+    except (KeyError, TypeError, ValueError):
+        await sio.emit('error', {'message': 'Invalid location'}, room=sid)
+        return
+    
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        await sio.emit('error', {'message': 'Invalid location'}, room=sid)
+        return
+    
+    # A socket outlives its user's deletion or deactivation; stop accepting its positions
+    identity = identity_cache.get(user_id) or await asyncio.to_thread(_load_socket_identity, user_id)
+    if identity is None or not identity.is_active:
+        await sio.emit('error', {'message': 'Account is inactive or no longer exists'}, room=sid)
+        return
+    
+    record = live_locations.update(user_id, latitude, longitude, data.get('address'))
+    await move_to_geo_room(user_id, latitude, longitude)
+    await emit_user_location_update(record.to_dict())
+
+
 async def emit_sos_created(sos_data: dict):
-    """Emit SOS created event to all connected users"""
-    await sio.emit('sos_created', sos_data)
-    print(f"Emitted SOS created: {sos_data}")
+    """Emit SOS created event to volunteers in nearby regions and admins"""
+    rooms = geo_rooms_within(sos_data['latitude'], sos_data['longitude'], settings.GEO_ALERT_RADIUS_KM)
+    await sio.emit('sos_created', sos_data, room=rooms + ['admin'])
+    log_event(logger, 'sos_created', sos_id=sos_data['id'], rooms=len(rooms) + 1)
+
+
+async def emit_sos_linked(sos_data: dict):
+    """Emit a duplicate SOS that was linked to an existing one to admins"""
+    await sio.emit('sos_linked', sos_data, room='admin')
+    log_event(logger, 'sos_linked', sos_id=sos_data['id'], duplicate_of_id=sos_data['duplicate_of_id'])
 
 
 async def emit_incident_created(incident_data: dict):
-    """Emit incident created event to all connected users"""
-    await sio.emit('incident_created', incident_data)
-    print(f"Emitted incident created: {incident_data}")
+    """Emit incident created event to volunteers in nearby regions and admins"""
+    rooms = geo_rooms_within(incident_data['latitude'], incident_data['longitude'], settings.GEO_ALERT_RADIUS_KM)
+    await sio.emit('incident_created', incident_data, room=rooms + ['admin'])
+    log_event(logger, 'incident_created', incident_id=incident_data['id'], rooms=len(rooms) + 1)
+
+
+async def emit_items_ingested(sos_list: List[dict], incident_list: List[dict]):
+    """Emit a bulk ingest as one frame per room: everything to admins, nearby items to region rooms"""
+    by_room: Dict[str, Dict[str, List[dict]]] = {}
+    for kind, items in (('sos', sos_list), ('incidents', incident_list)):
+        for item in items:
+            if item.get('duplicate_of_id'):
+                continue
+            for room in geo_rooms_within(item['latitude'], item['longitude'], settings.GEO_ALERT_RADIUS_KM):
+                by_room.setdefault(room, {'sos': [], 'incidents': []})[kind].append(item)
+    
+    emits = [sio.emit('items_ingested', {'sos': sos_list, 'incidents': incident_list}, room='admin')]
+    for room, payload in by_room.items():
+        emits.append(sio.emit('items_ingested', payload, room=room))
+    
+    await asyncio.gather(*emits)
+    log_event(logger, 'items_ingested', sos=len(sos_list), incidents=len(incident_list), regions=len(by_room))
+
+
+async def emit_incident_updated(incident_delta: dict, citizen_id: int):
+    """Emit the changed fields of an incident to its reporter and admins"""
+    rooms = [user_room(citizen_id), 'admin']
+    await event_batcher.emit('incident_updated', incident_delta, rooms)
+    log_event(logger, 'incident_updated', incident_id=incident_delta['id'], version=incident_delta.get('version'))
 
 
 async def emit_task_assigned(task_data: dict, volunteer_id: int):
     """Emit task assigned event to volunteer and admins"""
-    # Notify volunteer
-    if volunteer_id in connected_users:
-        for sid in connected_users[volunteer_id]:
-            await sio.emit('task_assigned', task_data, room=sid)
+    # One frame per recipient socket, sent concurrently; a socket in both rooms gets it once
+    await sio.emit('task_assigned', task_data, room=[user_room(volunteer_id), 'admin'])
+    log_event(logger, 'task_assigned', task_id=task_data.get('id'), volunteer_id=volunteer_id)
+
+
+async def emit_tasks_assigned(tasks_data: List[dict]):
+    """Emit a batch of task assignments: one frame per volunteer and one for admins"""
+    by_volunteer: Dict[int, List[dict]] = {}
+    for task_data in tasks_data:
+        by_volunteer.setdefault(task_data['volunteer_id'], []).append(task_data)
+    
+    emits = [sio.emit('tasks_assigned', tasks_data, room='admin')]
+    for volunteer_id, volunteer_tasks in by_volunteer.items():
+        emits.append(sio.emit('tasks_assigned', volunteer_tasks, room=user_room(volunteer_id)))
     
-    # Notify admins
-    await sio.emit('task_assigned', task_data, room='admin')
-    print(f"Emitted task assigned to volunteer {volunteer_id} and admins")
+    await asyncio.gather(*emits)
+    log_event(logger, 'tasks_assigned', tasks=len(tasks_data), volunteers=len(by_volunteer))
 
 
 async def emit_task_updated(task_data: dict, user_ids: list):
-    """Emit task update to relevant users and admins"""
-    for user_id in user_ids:
-        if user_id and user_id in connected_users:
-            for sid in connected_users[user_id]:
-                await sio.emit('task_updated', task_data, room=sid)
-    
-    # Notify admins
-    await sio.emit('task_updated', task_data, room='admin')
-    print(f"Emitted task updated to users: {user_ids} and admins")
+    """Emit a task's changed fields (see app.deltas) to relevant users and admins"""
+    rooms = [user_room(user_id) for user_id in user_ids if user_id] + ['admin']
+    await event_batcher.emit('task_updated', task_data, rooms)
+    log_event(logger, 'task_updated', task_id=task_data['id'], version=task_data.get('version'), rooms=len(rooms))
 
 
 async def emit_broadcast(broadcast_data: dict):
     """Emit broadcast to all connected users"""
     await sio.emit('broadcast_message', broadcast_data)
-    print(f"Emitted broadcast: {broadcast_data}")
+    log_event(logger, 'broadcast_message', broadcast_id=broadcast_data.get('id'))
 
 
 async def emit_user_location_update(user_data: dict):
     """Emit user location update to admin room"""
-    await sio.emit('user_location_updated', user_data, room='admin')
-    print(f"Emitted location update for user: {user_data}")
+    await event_batcher.emit('user_location_updated', user_data, ['admin'])
+    log_event(logger, 'user_location_updated', user_id=user_data.get('user_id'))
 
 
 async def emit_volunteer_status_change(volunteer_data: dict):
     """Emit volunteer status change"""
-    await sio.emit('volunteer_status_changed', volunteer_data)
-    print(f"Emitted volunteer status change: {volunteer_data}")
+    await event_batcher.emit('volunteer_status_changed', volunteer_data)
+    log_event(logger, 'volunteer_status_changed', user_id=volunteer_data.get('id'),
+              status=volunteer_data.get('volunteer_status'))
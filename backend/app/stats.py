@@ -0,0 +1,227 @@
+import asyncio
+import threading
+from collections import Counter
+from typing import Dict, Iterable
+from sqlalchemy import event, func, inspect, select, true
+from sqlalchemy.orm import Session, ORMExecuteState
+from app.database import SessionLocal
+from app.indexbus import index_bus
+from app.models import User, SOSRequest, IncidentReport, Task, TaskStatus, UserRole, VolunteerStatus
+from app.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Task statuses counted as "pending" on the admin dashboard
+PENDING_TASK_STATUSES = (TaskStatus.PENDING, TaskStatus.ASSIGNED)
+
+# Entity attributes whose changes move a row between counters
+TRACKED_ATTRIBUTES = {
+    SOSRequest: ("status",),
+    IncidentReport: ("status",),
+    Task: ("status",),
+    User: ("role", "volunteer_status"),
+}
+
+# Bulk INSERT/UPDATE/DELETE on these tables bypasses per-object events
+BULK_TRACKED_TABLES = {SOSRequest.__tablename__, IncidentReport.__tablename__, Task.__tablename__}
+
+
+def counter_keys(obj_type: type, values: Dict[str, object]) -> Iterable[str]:
+    """The dashboard counters a row with these attribute values contributes to"""
+    if obj_type is SOSRequest:
+        yield "sos_total"
+        if values["status"] == TaskStatus.COMPLETED:
+            yield "sos_completed"
+    elif obj_type is IncidentReport:
+        yield "incidents_total"
+        if values["status"] == TaskStatus.COMPLETED:
+            yield "incidents_completed"
+    elif obj_type is Task:
+        if values["status"] in PENDING_TASK_STATUSES:
+            yield "tasks_pending"
+        elif values["status"] == TaskStatus.COMPLETED:
+            yield "tasks_completed"
+    elif obj_type is User:
+        if values["role"] == UserRole.CITIZEN:
+            yield "citizens"
+        elif values["role"] == UserRole.VOLUNTEER and values["volunteer_status"] == VolunteerStatus.ONLINE:
+            yield "volunteers_online"
+
+
+def admin_counts_query():
+    """Every admin dashboard counter in one statement, using FILTER aggregates"""
+    sos = select(
+        func.count().label("sos_total"),
+        func.count().filter(SOSRequest.status == TaskStatus.COMPLETED).label("sos_completed"),
+    ).select_from(SOSRequest).subquery()
+    incidents = select(
+        func.count().label("incidents_total"),
+        func.count().filter(IncidentReport.status == TaskStatus.COMPLETED).label("incidents_completed"),
+    ).select_from(IncidentReport).subquery()
+    tasks = select(
+        func.count().filter(Task.status.in_(PENDING_TASK_STATUSES)).label("tasks_pending"),
+        func.count().filter(Task.status == TaskStatus.COMPLETED).label("tasks_completed"),
+    ).select_from(Task).subquery()
+    users = select(
+        func.count().filter(User.role == UserRole.CITIZEN).label("citizens"),
+        func.count().filter(
+            User.role == UserRole.VOLUNTEER,
+            User.volunteer_status == VolunteerStatus.ONLINE
+        ).label("volunteers_online"),
+    ).select_from(User).subquery()
+
+    return (
+        select(*sos.c, *incidents.c, *tasks.c, *users.c)
+        .select_from(sos)
+        .join(incidents, true())
+        .join(tasks, true())
+        .join(users, true())
+    )
+
+
+class DashboardCounters:
+    """Dashboard totals kept current from committed ORM changes.
+
+    Flushes record per-row counter deltas which are applied when the
+    transaction commits. Bulk INSERT/UPDATE/DELETE statements cannot be tracked row
+    by row, so those that touch any rows mark the counters stale and the next
+    read reconciles them against the database with admin_counts_query.
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._loaded = False
+        self._stale = False
+        self._lock = threading.Lock()
+
+    def apply(self, deltas: Counter):
+        with self._lock:
+            self._counts.update(deltas)
+
+    def mark_stale(self):
+        self._stale = True
+
+    def reconcile(self, db: Session) -> Dict[str, int]:
+        """Replace the counters with fresh totals from the database"""
+        self._stale = False
+        row = db.execute(admin_counts_query()).one()
+        with self._lock:
+            self._counts = Counter(row._asdict())
+            self._loaded = True
+            return dict(self._counts)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Current totals, reconciling against the primary first if they are missing or stale"""
+        if not self._loaded or self._stale:
+            return reconcile_dashboard_counters()
+        with self._lock:
+            return dict(self._counts)
+
+
+dashboard_counters = DashboardCounters()
+
+
+@index_bus.handler("counter_deltas")
+def _apply_published_deltas(deltas: Dict[str, int]):
+    dashboard_counters.apply(Counter(deltas))
+
+
+index_bus.handler("counters_stale")(dashboard_counters.mark_stale)
+
+_DELTAS_KEY = "dashboard_counter_deltas"
+_BULK_KEY = "dashboard_counter_bulk"
+
+
+def _values(obj, attributes, committed: bool) -> Dict[str, object]:
+    """Attribute values of a flushed object, before (committed) or after the flush"""
+    state = inspect(obj)
+    values = {}
+    for attribute in attributes:
+        history = state.attrs[attribute].history
+        if committed and history.deleted:
+            values[attribute] = history.deleted[0]
+        else:
+            values[attribute] = getattr(obj, attribute)
+    return values
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_counter_deltas(session: Session, flush_context):
+    deltas = session.info.setdefault(_DELTAS_KEY, Counter())
+    for obj in session.new:
+        attributes = TRACKED_ATTRIBUTES.get(type(obj))
+        if attributes:
+            deltas.update(counter_keys(type(obj), _values(obj, attributes, committed=False)))
+    for obj in session.deleted:
+        attributes = TRACKED_ATTRIBUTES.get(type(obj))
+        if attributes:
+            deltas.subtract(counter_keys(type(obj), _values(obj, attributes, committed=True)))
+    for obj in session.dirty:
+        attributes = TRACKED_ATTRIBUTES.get(type(obj))
+        if attributes and session.is_modified(obj, include_collections=False):
+            deltas.subtract(counter_keys(type(obj), _values(obj, attributes, committed=True)))
+            deltas.update(counter_keys(type(obj), _values(obj, attributes, committed=False)))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_statements(orm_execute_state: ORMExecuteState):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    if getattr(orm_execute_state.statement.table, "name", None) not in BULK_TRACKED_TABLES:
+        return None
+    if orm_execute_state.is_insert:
+        orm_execute_state.session.info[_BULK_KEY] = True
+        return None
+    
+    # UPDATE/DELETE that matched nothing (e.g. linked_status_update on a primary without
+    # duplicates, which runs on every status change) leaves the counters exact
+    result = orm_execute_state.invoke_statement()
+    if orm_execute_state.statement.returning_column_descriptions:
+        # ORM RETURNING results have no rowcount; count the rows and hand back a replayable copy
+        frozen = result.freeze()
+        matched = len(frozen.data)
+        result = frozen()
+    else:
+        matched = result.rowcount
+    if matched != 0:
+        orm_execute_state.session.info[_BULK_KEY] = True
+    return result
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_counter_deltas(session: Session):
+    """Apply a committed transaction's counter changes here and on every other worker"""
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if deltas:
+        dashboard_counters.apply(deltas)
+        changed = {key: count for key, count in deltas.items() if count}
+        if changed:
+            index_bus.publish("counter_deltas", changed)
+    if session.info.pop(_BULK_KEY, False):
+        dashboard_counters.mark_stale()
+        index_bus.publish("counters_stale")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_counter_deltas(session: Session, previous_transaction):
+    session.info.pop(_DELTAS_KEY, None)
+    session.info.pop(_BULK_KEY, None)
+
+
+def reconcile_dashboard_counters() -> Dict[str, int]:
+    """Reconcile the counters using a short-lived session"""
+    db = SessionLocal()
+    try:
+        return dashboard_counters.reconcile(db)
+    finally:
+        db.close()
+
+
+async def reconcile_counters_periodically(interval: float):
+    """Background loop correcting any counter drift every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(reconcile_dashboard_counters)
+        except Exception:
+            logger.exception("Dashboard counter reconcile failed")
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from typing import Dict
+from app.config import settings
+
+
+class RevocationStore:
+    """Refresh token ids (jti) that have been used or revoked, kept until they expire.
+
+    Entries map jti -> expiry timestamp, so the store only ever holds tokens
+    that could still pass a signature check and prunes itself as they lapse.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, int] = {}
+        self._next_prune = 0.0
+        self._journal = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: str) -> bool:
+        with self._lock:
+            return jti in self._revoked
+
+    def revoke(self, jti: str, expires_at: int) -> bool:
+        """Revoke a token id; returns False if it was already revoked"""
+        with self._lock:
+            self._prune()
+            if jti in self._revoked:
+                return False
+            self._revoked[jti] = expires_at
+            self._append(jti, expires_at)
+            return True
+
+    def _prune(self):
+        now = time.time()
+        if now < self._next_prune:
+            return
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._next_prune = now + 60
+
+    def open(self, path: str) -> int:
+        """Replay a revocation journal and append every later revocation to it as it happens.
+
+        The journal holds one `[jti, expires_at]` JSON line per revocation and
+        is compacted to its unexpired entries on open and close, so a crash
+        loses nothing that was already written. A snapshot written by an older
+        version (one JSON object) is read as well.
+        """
+        saved = read_journal(path)
+        with self._lock:
+            self._revoked.update(saved)
+            self._journal = self._compact(path)
+            return len(self._revoked)
+
+    def close(self) -> int:
+        """Compact the journal and stop writing to it"""
+        with self._lock:
+            if self._journal is None:
+                return 0
+            path = self._journal.name
+            self._journal.close()
+            self._journal = None
+            self._next_prune = 0.0
+            self._prune()
+            self._compact(path).close()
+            return len(self._revoked)
+
+    def _compact(self, path: str):
+        """Rewrite the journal with the current entries and reopen it for appending"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            for jti, exp in self._revoked.items():
+                f.write(json.dumps([jti, exp]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return open(path, "a")
+
+    def _append(self, jti: str, expires_at: int):
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps([jti, expires_at]) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+
+class RedisRevocationStore:
+    """Revocations shared by every worker through a Redis-protocol server.
+
+    Each revoked jti is a key expiring with its token, and SET NX makes the
+    first rotation win whichever worker serves it. Redis persists the keys.
+    """
+
+    def __init__(self, url: str, prefix: str = "revoked-refresh"):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def is_revoked(self, jti: str) -> bool:
+        return bool(self.redis.exists(f"{self.prefix}:{jti}"))
+
+    def revoke(self, jti: str, expires_at: int) -> bool:
+        """Revoke a token id; returns False if it was already revoked"""
+        return bool(self.redis.set(f"{self.prefix}:{jti}", 1, nx=True, exat=expires_at))
+
+    def open(self, path: str) -> int:
+        """Copy a local revocation journal into Redis (switching from a single worker)"""
+        saved = read_journal(path)
+        for jti, exp in saved.items():
+            self.revoke(jti, exp)
+        return len(saved)
+
+    def close(self) -> int:
+        self.redis.close()
+        return 0
+
+
+def read_journal(path: str) -> Dict[str, int]:
+    """Unexpired entries of a revocation journal (or an older single-object snapshot)"""
+    now = time.time()
+    saved: Dict[str, int] = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                entries = entry.items() if isinstance(entry, dict) else [entry]
+                saved.update({jti: int(exp) for jti, exp in entries if exp > now})
+    return saved
+
+
+def create_revocation_store(url: str):
+    """Shared revocations when a Redis message queue is configured, in-process otherwise"""
+    if url.split("://", 1)[0] in ("redis", "rediss"):
+        return RedisRevocationStore(url)
+    return RevocationStore()
+
+
+revoked_refresh_tokens = create_revocation_store(settings.SOCKETIO_MESSAGE_QUEUE)
+
+
+def load_revocations() -> int:
+    if not settings.REFRESH_REVOCATION_FILE:
+        return 0
+    return revoked_refresh_tokens.open(settings.REFRESH_REVOCATION_FILE)
+
+
+def save_revocations() -> int:
+    return revoked_refresh_tokens.close()
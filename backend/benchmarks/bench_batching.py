@@ -0,0 +1,108 @@
+"""Measure frames and bytes per second reaching admin sockets during an update surge.
+
+Replays SURGE_SECONDS of task_updated, user_location_updated and
+volunteer_status_changed events at EVENTS_PER_SECOND through the app's
+emit helpers, with ADMINS in-process admin sockets, once sending every
+event directly and once per batch window. Each admin socket's frames and
+encoded bytes are counted at the transport; the last column is the event
+rate the surge actually reached (unbatched sends slow the producer down).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_batching
+"""
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@resq.net")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from app import socketio_server  # noqa: E402
+from app.batching import EventBatcher  # noqa: E402
+from app.socketio_server import (  # noqa: E402
+    emit_task_updated, emit_user_location_update, emit_volunteer_status_change, sio
+)
+
+ADMINS = 5
+EVENTS_PER_SECOND = 3_000
+SURGE_SECONDS = 2
+TICK_SECONDS = 0.01
+TASKS = 300
+VOLUNTEERS = 500
+WINDOWS_MS = (0, 100, 250)
+
+USER = {"id": 1, "email": "volunteer@resq.net", "full_name": "Field Volunteer", "phone": "+10000000000",
+        "role": "volunteer", "volunteer_status": "busy", "is_active": True, "latitude": 12.97, "longitude": 77.59}
+
+
+def task_payload(task_id: int, status: str) -> dict:
+    return {"id": task_id, "status": status, "volunteer_id": task_id % VOLUNTEERS + 1, "sos_request_id": task_id,
+            "incident_report_id": None, "notes": "En route", "assigned_at": "2024-01-01T00:00:00",
+            "volunteer": USER, "sos_request": {"id": task_id, "citizen": USER, "description": "Trapped on roof"}}
+
+
+async def surge(rng: random.Random):
+    per_tick = int(EVENTS_PER_SECOND * TICK_SECONDS)
+    for _ in range(int(SURGE_SECONDS / TICK_SECONDS)):
+        emits = []
+        for _ in range(per_tick):
+            kind = rng.random()
+            if kind < 0.4:
+                task_id = rng.randint(1, TASKS)
+                emits.append(emit_task_updated(task_payload(task_id, rng.choice(["accepted", "responding"])), []))
+            elif kind < 0.9:
+                emits.append(emit_user_location_update({
+                    "user_id": rng.randint(1, VOLUNTEERS), "latitude": rng.uniform(12, 13),
+                    "longitude": rng.uniform(77, 78), "address": None, "updated_at": time.time(),
+                }))
+            else:
+                emits.append(emit_volunteer_status_change({
+                    "id": rng.randint(1, VOLUNTEERS), "volunteer_status": rng.choice(["online", "busy"]),
+                }))
+        await asyncio.gather(*emits)
+        await asyncio.sleep(TICK_SECONDS)
+
+
+async def measure(window_ms: float):
+    frames = 0
+    sent_bytes = 0
+
+    async def count_write(eio_sid, eio_pkt):
+        nonlocal frames, sent_bytes
+        frames += 1
+        encoded = eio_pkt.encode()
+        sent_bytes += len(encoded.encode() if isinstance(encoded, str) else encoded)
+
+    sio._send_eio_packet = count_write
+    socketio_server.event_batcher = EventBatcher(sio.emit, default_window=window_ms / 1000, enabled=window_ms > 0)
+
+    start = time.perf_counter()
+    await surge(random.Random(7))
+    await asyncio.sleep(window_ms / 1000)
+    await socketio_server.event_batcher.flush_all()
+    elapsed = time.perf_counter() - start
+    return frames / ADMINS, sent_bytes / ADMINS, elapsed
+
+
+async def main():
+    for admin in range(ADMINS):
+        sid = await sio.manager.connect(f"eio-admin-{admin}", "/")
+        await sio.enter_room(sid, "admin")
+
+    print(f"{EVENTS_PER_SECOND} events/s for {SURGE_SECONDS}s over {TASKS} tasks and {VOLUNTEERS} volunteers, "
+          f"per admin socket")
+    print(f"{'window':>8} {'frames':>8} {'KB':>8} {'frames/s':>9} {'KB/s':>8} {'events/s':>9}")
+    events = EVENTS_PER_SECOND * SURGE_SECONDS
+    for window_ms in WINDOWS_MS:
+        frames, sent_bytes, elapsed = await measure(window_ms)
+        label = f"{window_ms:.0f} ms" if window_ms else "off"
+        print(f"{label:>8} {frames:>8.0f} {sent_bytes / 1024:>8.0f} {frames / elapsed:>9.0f} "
+              f"{sent_bytes / 1024 / elapsed:>8.0f} {events / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
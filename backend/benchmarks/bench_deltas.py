@@ -0,0 +1,71 @@
+"""Compare full-snapshot and versioned-delta payload sizes for task updates.
+
+Builds a task as the API serializes it (TaskResponse with its volunteer,
+SOS request and citizen), applies the typical updates of a task's life
+and reports the JSON bytes of the full object against the `task_updated`
+delta that app.deltas produces for it.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_deltas
+"""
+import copy
+import json
+
+from app.deltas import versioned_delta
+
+USER = {"id": 7, "email": "volunteer@resq.net", "full_name": "Field Volunteer", "phone": "+10000000000",
+        "role": "volunteer", "is_active": True, "volunteer_status": "busy", "skills": "first aid, swimming",
+        "latitude": 12.9716, "longitude": 77.5946, "address": "MG Road, Bengaluru",
+        "created_at": "2024-01-01T00:00:00"}
+CITIZEN = {**USER, "id": 3, "email": "citizen@resq.net", "full_name": "Reporting Citizen", "role": "citizen",
+           "volunteer_status": None, "skills": None}
+
+TASK = {
+    "id": 42, "version": 1, "sos_request_id": 11, "incident_report_id": None, "volunteer_id": 7,
+    "status": "assigned", "notes": None, "assigned_at": "2024-01-01T10:00:00", "accepted_at": None,
+    "completed_at": None, "volunteer": USER,
+    "sos_request": {"id": 11, "citizen_id": 3, "latitude": 12.97, "longitude": 77.59, "address": "MG Road",
+                    "description": "Water rising, family of four trapped on the roof", "emergency_type": "flood",
+                    "status": "assigned", "priority": 5, "duplicate_of_id": None, "created_at": "2024-01-01T09:58:00",
+                    "updated_at": "2024-01-01T10:00:00", "citizen": CITIZEN},
+    "incident_report": None,
+}
+
+UPDATES = [
+    ("accepted", {"status": "accepted", "accepted_at": "2024-01-01T10:01:00"}),
+    ("responding", {"status": "responding", "sos_request": {"status": "responding"}}),
+    ("notes", {"notes": "Boat arriving in ten minutes"}),
+    ("completed", {"status": "completed", "completed_at": "2024-01-01T11:30:00",
+                   "sos_request": {"status": "completed", "updated_at": "2024-01-01T11:30:00"}}),
+]
+
+
+def size(payload: dict) -> int:
+    return len(json.dumps(payload, separators=(",", ":")).encode())
+
+
+def main():
+    task = copy.deepcopy(TASK)
+    full_total = delta_total = 0
+
+    print(f"{'update':>12} {'full B':>8} {'delta B':>8} {'ratio':>7}")
+    for name, changes in UPDATES:
+        before = copy.deepcopy(task)
+        for key, value in changes.items():
+            if isinstance(value, dict):
+                task[key] = {**task[key], **value}
+            else:
+                task[key] = value
+        task["version"] += 1
+
+        full, delta = size(task), size(versioned_delta(before, task))
+        full_total += full
+        delta_total += delta
+        print(f"{name:>12} {full:>8} {delta:>8} {full / delta:>6.1f}x")
+
+    print(f"{'total':>12} {full_total:>8} {delta_total:>8} {full_total / delta_total:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Measure volunteer selection latency for automatic SOS dispatch.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_dispatch
+"""
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@resq.net")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from app.dispatch import VolunteerRegistry  # noqa: E402
+from app.models import TaskStatus  # noqa: E402
+
+VOLUNTEERS = 10_000
+QUERIES = 1_000
+
+
+def main():
+    rng = random.Random(42)
+    registry = VolunteerRegistry()
+
+    for volunteer_id in range(1, VOLUNTEERS + 1):
+        registry.index.insert(volunteer_id, rng.uniform(8.0, 12.0), rng.uniform(74.0, 78.0))
+        for task_id in range(rng.randint(0, 2)):
+            registry.sync_task(volunteer_id * 10 + task_id, volunteer_id, TaskStatus.ASSIGNED)
+
+    timings = []
+    for _ in range(QUERIES):
+        latitude, longitude = rng.uniform(8.0, 12.0), rng.uniform(74.0, 78.0)
+        start = time.perf_counter()
+        registry.best_volunteer(latitude, longitude)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(f"{VOLUNTEERS} online volunteers, {QUERIES} dispatch decisions")
+    print(f"  median {statistics.median(timings):.3f} ms")
+    print(f"  p99    {timings[int(len(timings) * 0.99)]:.3f} ms")
+    print(f"  max    {timings[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
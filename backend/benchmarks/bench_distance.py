@@ -0,0 +1,50 @@
+"""Compare per-row math Haversine against the NumPy batch kernel.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_distance
+"""
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@resq.net")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+import numpy as np  # noqa: E402
+from app.geo import calculate_distance, calculate_distances  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+REPEATS = 5
+
+
+def best_of(fn, repeats: int = REPEATS) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    rng = random.Random(42)
+    origin = (10.0, 76.0)
+
+    print(f"{'points':>8}  {'math loop (ms)':>15}  {'numpy (ms)':>11}  {'speedup':>8}")
+    for size in SIZES:
+        lats = [rng.uniform(8.0, 12.0) for _ in range(size)]
+        lons = [rng.uniform(74.0, 78.0) for _ in range(size)]
+        lat_array = np.array(lats)
+        lon_array = np.array(lons)
+
+        loop = best_of(lambda: [calculate_distance(*origin, lat, lon) for lat, lon in zip(lats, lons)])
+        batch = best_of(lambda: calculate_distances(*origin, lat_array, lon_array))
+
+        print(f"{size:>8}  {loop * 1000:>15.2f}  {batch * 1000:>11.2f}  {loop / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
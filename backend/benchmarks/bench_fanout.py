@@ -0,0 +1,84 @@
+"""Measure Socket.IO fan-out latency for targeted task events.
+
+Connects in-process fake sockets (SOCKETS_PER_USER per user) to the app's
+server, with every transport write taking WRITE_LATENCY_MS, and compares
+awaiting one emit per socket in turn against emit_task_updated's single
+emit to the users' `user:<id>` rooms.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_fanout
+"""
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@resq.net")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+# Measures the emit path itself, so task_updated goes out immediately instead of per tick
+os.environ.setdefault("SOCKET_BATCHING_ENABLED", "false")
+
+from app.socketio_server import emit_task_updated, local_user_sids, sio, user_room  # noqa: E402
+
+RECIPIENTS = (1, 10, 1_000)
+SOCKETS_PER_USER = 2
+WRITE_LATENCY_MS = 1.0
+ROUNDS = 5
+TASK = {"id": 1, "status": "accepted", "volunteer_id": 1}
+
+
+async def slow_write(eio_sid, eio_pkt):
+    await asyncio.sleep(WRITE_LATENCY_MS / 1000)
+
+
+async def connect_users(count: int, first_id: int):
+    user_ids = list(range(first_id, first_id + count))
+    for user_id in user_ids:
+        for tab in range(SOCKETS_PER_USER):
+            sid = await sio.manager.connect(f"eio-{user_id}-{tab}", "/")
+            await sio.enter_room(sid, user_room(user_id))
+    return user_ids
+
+
+async def sequential_fanout(user_ids):
+    """The previous approach: one awaited emit per socket"""
+    for user_id in user_ids:
+        for sid in local_user_sids(user_id):
+            await sio.emit("task_updated", TASK, room=sid)
+    await sio.emit("task_updated", TASK, room="admin")
+
+
+async def room_fanout(user_ids):
+    await emit_task_updated(TASK, user_ids)
+
+
+async def timed(fanout, user_ids) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        await fanout(user_ids)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def main():
+    logging.getLogger("socketio.server").setLevel(logging.WARNING)
+    sio._send_eio_packet = slow_write
+
+    print(f"{SOCKETS_PER_USER} sockets per user, {WRITE_LATENCY_MS:.1f} ms per socket write, median of {ROUNDS}")
+    print(f"{'recipients':>10} {'per-socket awaits':>18} {'room emit':>10}")
+    first_id = 1
+    for count in RECIPIENTS:
+        user_ids = await connect_users(count, first_id)
+        first_id += count
+        sequential = await timed(sequential_fanout, user_ids)
+        rooms = await timed(room_fanout, user_ids)
+        print(f"{count:>10} {sequential:>15.1f} ms {rooms:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
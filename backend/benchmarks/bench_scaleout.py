@@ -0,0 +1,156 @@
+"""Measure Socket.IO event throughput across worker processes sharing a message queue.
+
+Starts WORKER_COUNTS worker processes, each importing the app's Socket.IO
+server with SOCKETIO_MESSAGE_QUEUE set and holding in-process fake sockets
+for its share of USERS (SOCKETS_PER_USER each). Every worker then emits its
+share of EVENTS through emit_task_updated to users held by *other* workers,
+so each delivery crosses the message queue. Throughput is measured from the
+first emit until every expected frame reached its socket.
+
+Uses the Redis server in SOCKETIO_MESSAGE_QUEUE when set; otherwise starts a
+local Redis-compatible stand-in (requires `pip install fakeredis`). The
+stand-in is single-threaded Python, so absolute numbers against it are far
+below a real Redis.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_scaleout
+    SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0 python -m benchmarks.bench_scaleout
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@resq.net")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+# Measures the emit path itself, so task_updated goes out immediately instead of per tick
+os.environ.setdefault("SOCKET_BATCHING_ENABLED", "false")
+
+WORKER_COUNTS = (1, 4, 8)
+USERS = 400
+SOCKETS_PER_USER = 2
+EVENTS = 2_000
+TIMEOUT_SECONDS = 120
+TASK = {"id": 1, "status": "accepted", "volunteer_id": 1}
+
+
+def owner(user_id: int, workers: int) -> int:
+    return user_id % workers
+
+
+def targets(worker: int, workers: int):
+    """Users this worker emits to: round-robin over users held by the other workers"""
+    users = [user_id for user_id in range(1, USERS + 1) if workers == 1 or owner(user_id, workers) != worker]
+    share = range(worker, EVENTS, workers)
+    return [users[index % len(users)] for index in share]
+
+
+def expected_deliveries(worker: int, workers: int) -> int:
+    return sum(
+        SOCKETS_PER_USER
+        for sender in range(workers)
+        for user_id in targets(sender, workers)
+        if owner(user_id, workers) == worker
+    )
+
+
+async def run_worker(worker: int, workers: int, ready, start, results):
+    from app.socketio_server import emit_task_updated, sio, user_room
+
+    expected = expected_deliveries(worker, workers)
+    received = 0
+    done = asyncio.Event()
+
+    async def count_write(eio_sid, eio_pkt):
+        nonlocal received
+        received += 1
+        if received >= expected:
+            done.set()
+
+    sio._send_eio_packet = count_write
+    sio.manager_initialized = True
+    sio.manager.initialize()
+    for user_id in range(1, USERS + 1):
+        if owner(user_id, workers) != worker:
+            continue
+        for tab in range(SOCKETS_PER_USER):
+            sid = await sio.manager.connect(f"eio-{worker}-{user_id}-{tab}", "/")
+            await sio.enter_room(sid, user_room(user_id))
+
+    # Give the queue listener time to subscribe before anyone publishes
+    await asyncio.sleep(1)
+    ready.wait()
+    await asyncio.to_thread(start.wait)
+    for user_id in targets(worker, workers):
+        await emit_task_updated(TASK, [user_id])
+
+    try:
+        await asyncio.wait_for(done.wait(), TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    results.put((worker, received, expected, time.time()))
+
+
+def worker_main(worker: int, workers: int, ready, start, results):
+    asyncio.run(run_worker(worker, workers, ready, start, results))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stand_in() -> str:
+    from fakeredis import TcpFakeServer
+
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def measure(context, workers: int):
+    ready = context.Barrier(workers + 1)
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker_main, args=(worker, workers, ready, start, results))
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    ready.wait()
+    started = time.time()
+    start.set()
+    reports = [results.get(timeout=TIMEOUT_SECONDS + 30) for _ in processes]
+    for process in processes:
+        process.join()
+
+    received = sum(report[1] for report in reports)
+    expected = sum(report[2] for report in reports)
+    elapsed = max(report[3] for report in reports) - started
+    return received, expected, elapsed
+
+
+def main():
+    url = os.environ.get("SOCKETIO_MESSAGE_QUEUE") or start_stand_in()
+    os.environ["SOCKETIO_MESSAGE_QUEUE"] = url
+    context = multiprocessing.get_context("spawn")
+
+    print(f"{EVENTS} task_updated events to {USERS} users x {SOCKETS_PER_USER} sockets via {url}")
+    print(f"{'workers':>7} {'delivered':>11} {'seconds':>8} {'events/s':>9} {'frames/s':>9}")
+    for workers in WORKER_COUNTS:
+        received, expected, elapsed = measure(context, workers)
+        print(f"{workers:>7} {received:>5}/{expected:<5} {elapsed:>8.2f} "
+              f"{EVENTS / elapsed:>9.0f} {received / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Fail when POST /api/tasks/assign-batch breaks on a batch that matches work.
+
+Seeds a throwaway SQLite database with one online volunteer, a pending SOS
+with a linked duplicate and a pending incident, then calls the
+assign_pending_batch handler directly and checks that both items are
+assigned, the duplicate follows its primary and the dashboard counters
+agree with the database afterwards.
+
+Run from the backend directory (exits non-zero on a failure):
+
+    python -m benchmarks.check_batch_assign
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "check_batch_assign.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@resq.net")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.identity import UserIdentity  # noqa: E402
+from app.models import (  # noqa: E402
+    IncidentReport, IncidentType, SOSRequest, TaskStatus, User, UserRole, VolunteerStatus
+)
+from app.routes.tasks import assign_pending_batch  # noqa: E402
+from app.stats import admin_counts_query, dashboard_counters  # noqa: E402
+
+
+def seed(db) -> UserIdentity:
+    admin = User(email="admin@resq.net", full_name="Admin", role=UserRole.ADMIN, hashed_password="x")
+    citizen = User(email="citizen@resq.net", full_name="Citizen", role=UserRole.CITIZEN, hashed_password="x")
+    volunteer = User(volunteer_id="VOL1", full_name="Volunteer", role=UserRole.VOLUNTEER, hashed_password="x",
+                     volunteer_status=VolunteerStatus.ONLINE, latitude=10.0, longitude=76.0)
+    db.add_all([admin, citizen, volunteer])
+    db.flush()
+
+    primary = SOSRequest(citizen_id=citizen.id, latitude=10.001, longitude=76.0)
+    db.add(primary)
+    db.flush()
+    db.add_all([
+        SOSRequest(citizen_id=citizen.id, latitude=10.001, longitude=76.0, duplicate_of_id=primary.id),
+        IncidentReport(citizen_id=citizen.id, incident_type=IncidentType.FIRE, title="Fire", description="Fire",
+                       latitude=10.002, longitude=76.0),
+    ])
+    db.commit()
+    return UserIdentity(admin.id, admin.role, admin.is_active)
+
+
+async def assign(admin: UserIdentity):
+    try:
+        async with AsyncSessionLocal() as db:
+            return await assign_pending_batch(current_user=admin, db=db)
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    failures = []
+    try:
+        admin = seed(db)
+        dashboard_counters.reconcile(db)
+
+        result = asyncio.run(assign(admin))
+        print(f"assign-batch          assigned={result.assigned} unassigned={result.unassigned}")
+        if result.assigned != 2:
+            failures.append(f"expected 2 assignments, got {result.assigned}")
+
+        statuses = [status for status, in db.query(SOSRequest.status).order_by(SOSRequest.id)]
+        if statuses != [TaskStatus.ASSIGNED, TaskStatus.ASSIGNED]:
+            failures.append(f"SOS primary and duplicate should both be assigned, got {statuses}")
+
+        expected = db.execute(admin_counts_query()).one()._asdict()
+        if dashboard_counters.snapshot() != expected:
+            failures.append(f"dashboard counters {dashboard_counters.snapshot()} != database {expected}")
+    finally:
+        db.close()
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Fail when a hot query stops using an index.
+
+Applies the migrations to a fresh database, then EXPLAINs the filters the
+API runs most often and fails on full table scans or explicit sorts.
+Against Postgres (set DATABASE_URL) sequential scans are disabled for the
+check, so the result does not depend on table sizes.
+
+Run from the backend directory (exits non-zero on a regression):
+
+    python -m benchmarks.check_indexes
+"""
+import os
+import sys
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@resq.net")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from sqlalchemy import func, select  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.dispatch import ACTIVE_TASK_STATUSES  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+from app.models import (  # noqa: E402
+    Comment, IncidentReport, IncidentType, Message, SOSRequest, Task, TaskStatus, User, UserRole, VolunteerStatus
+)
+from app.queryplan import assert_uses_indexes  # noqa: E402
+
+HOT_QUERIES = [
+    ("sos by status", select(SOSRequest).where(SOSRequest.status == TaskStatus.PENDING)
+        .order_by(SOSRequest.created_at.desc(), SOSRequest.id.desc()).limit(101)),
+    ("pending primary sos", select(SOSRequest.id, SOSRequest.latitude, SOSRequest.longitude)
+        .where(SOSRequest.status == TaskStatus.PENDING, SOSRequest.duplicate_of_id.is_(None))),
+    ("linked duplicates", select(SOSRequest.id).where(SOSRequest.duplicate_of_id.in_([1, 2, 3]))),
+    ("incidents by status and type", select(IncidentReport)
+        .where(IncidentReport.status == TaskStatus.PENDING, IncidentReport.incident_type == IncidentType.FIRE)
+        .order_by(IncidentReport.created_at.desc(), IncidentReport.id.desc()).limit(101)),
+    ("pending incidents", select(IncidentReport.id).where(IncidentReport.status == TaskStatus.PENDING)),
+    ("volunteer active tasks", select(func.count()).select_from(Task)
+        .where(Task.volunteer_id == 1, Task.status.in_(ACTIVE_TASK_STATUSES))),
+    ("tasks by status", select(Task).where(Task.status == TaskStatus.ASSIGNED)
+        .order_by(Task.assigned_at.desc(), Task.id.desc()).limit(101)),
+    ("tasks for sos", select(Task).where(Task.sos_request_id.in_([1, 2, 3]))),
+    ("tasks for incidents", select(Task).where(Task.incident_report_id.in_([1, 2, 3]))),
+    ("unread count", select(func.count()).select_from(Message)
+        .where(Message.recipient_id == 1, Message.is_read == False)),
+    ("broadcast feed", select(Message).where(Message.is_broadcast == True)
+        .order_by(Message.created_at.desc(), Message.id.desc()).limit(101)),
+    ("task comments", select(Comment).where(Comment.task_id == 1)
+        .order_by(Comment.created_at, Comment.id).limit(101)),
+    ("online volunteers", select(User.id).where(User.role == UserRole.VOLUNTEER,
+                                                User.volunteer_status == VolunteerStatus.ONLINE)),
+]
+
+
+def main():
+    migrate(engine)
+
+    failed = False
+    with engine.begin() as conn:
+        for name, statement in HOT_QUERIES:
+            try:
+                plan = assert_uses_indexes(conn, statement)
+                print(f"{name:<30} {' | '.join(plan)}")
+            except AssertionError as exc:
+                failed = True
+                print(f"{name:<30} FAILED: {exc}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
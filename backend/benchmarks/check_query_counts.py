@@ -0,0 +1,105 @@
+"""Fail when list endpoints regress into N+1 queries.
+
+Seeds an in-memory database with ROWS tasks, messages and comments, each
+pointing at a distinct user, then calls the route handlers directly and
+checks the number of SQL statements stays within a fixed budget.
+
+Run from the backend directory (exits non-zero on a regression):
+
+    python -m benchmarks.check_query_counts
+"""
+import os
+import sys
+from fastapi import Response
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@resq.net")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.identity import UserIdentity  # noqa: E402
+from app.pagination import PageParams  # noqa: E402
+from app.models import (  # noqa: E402
+    Comment, IncidentReport, IncidentType, Message, SOSRequest, Task, User, UserRole
+)
+from app.querycount import assert_max_queries  # noqa: E402
+from app.routes.comments import get_task_comments  # noqa: E402
+from app.routes.messages import get_broadcasts, get_messages  # noqa: E402
+from app.routes.tasks import get_task, get_tasks  # noqa: E402
+
+ROWS = 200
+
+
+def seed(db):
+    admin = User(email="admin@resq.net", full_name="Admin", role=UserRole.ADMIN, hashed_password="x")
+    db.add(admin)
+    db.flush()
+
+    for i in range(ROWS):
+        citizen = User(email=f"citizen{i}@resq.net", full_name=f"Citizen {i}", role=UserRole.CITIZEN,
+                       hashed_password="x")
+        volunteer = User(volunteer_id=f"VOL{i}", full_name=f"Volunteer {i}", role=UserRole.VOLUNTEER,
+                         hashed_password="x")
+        db.add_all([citizen, volunteer])
+        db.flush()
+
+        if i % 2:
+            item = SOSRequest(citizen_id=citizen.id, latitude=10.0, longitude=76.0)
+        else:
+            item = IncidentReport(citizen_id=citizen.id, incident_type=IncidentType.FIRE, title="Fire",
+                                  description="Fire", latitude=10.0, longitude=76.0)
+        db.add(item)
+        db.flush()
+
+        task = Task(
+            volunteer_id=volunteer.id,
+            sos_request_id=item.id if i % 2 else None,
+            incident_report_id=None if i % 2 else item.id
+        )
+        db.add(task)
+        db.flush()
+
+        db.add_all([
+            Message(sender_id=volunteer.id, task_id=1, content="On my way", is_broadcast=True),
+            Comment(task_id=1, author_id=citizen.id, content="Thanks"),
+        ])
+
+    db.commit()
+    return UserIdentity(admin.id, admin.role, admin.is_active)
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        admin = seed(db)
+        page = PageParams(cursor=None, limit=ROWS)
+        checks = [
+            ("get_tasks", 6, lambda: get_tasks(Response(), status_filter=None, page=page, current_user=admin, db=db)),
+            ("get_task", 6, lambda: get_task(task_id=1, current_user=admin, db=db)),
+            ("get_messages", 2, lambda: get_messages(Response(), task_id=None, contact_id=None, page=page,
+                                                     current_user=admin, db=db)),
+            ("get_broadcasts", 1, lambda: get_broadcasts(Response(), page=page, current_user=admin, db=db)),
+            ("get_task_comments", 2, lambda: get_task_comments(task_id=1, response=Response(), page=page,
+                                                               current_user=admin, db=db)),
+        ]
+
+        failed = False
+        for name, budget, call in checks:
+            db.expire_all()
+            try:
+                with assert_max_queries(budget) as counter:
+                    call()
+                print(f"{name:<20} {counter.count:>3} queries (budget {budget})")
+            except AssertionError as exc:
+                failed = True
+                print(f"{name:<20} FAILED: {exc}")
+    finally:
+        db.close()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,10 +24,41 @@ api.interceptors.request.use(
     }
 );
 
+// Refresh tokens are single-use, so concurrent 401s share one refresh call
+let refreshing: Promise<string> | null = null;
+
+const refreshAccessToken = () => {
+    if (!refreshing) {
+        const refreshToken = localStorage.getItem('refresh_token');
+        refreshing = axios
+            .post(`${API_URL}/auth/refresh`, { refresh_token: refreshToken })
+            .then((response) => {
+                localStorage.setItem('access_token', response.data.access_token);
+                localStorage.setItem('refresh_token', response.data.refresh_token);
+                return response.data.access_token;
+            })
+            .finally(() => {
+                refreshing = null;
+            });
+    }
+    return refreshing;
+};
+
 // Response interceptor to handle errors
 api.interceptors.response.use(
     (response) => response,
-    (error) => {
+    async (error) => {
+        const original = error.config;
+        if (error.response?.status === 401 && original && !original._retry && localStorage.getItem('refresh_token')) {
+            original._retry = true;
+            try {
+                const token = await refreshAccessToken();
+                original.headers.Authorization = `Bearer ${token}`;
+                return api(original);
+            } catch {
+                // Fall through to logout
+            }
+        }
         if (error.response?.status === 401) {
             // Clear tokens and redirect to login
             localStorage.removeItem('access_token');
@@ -38,6 +69,21 @@ api.interceptors.response.use(
     }
 );
 
+// List endpoints are keyset paginated; follow X-Next-Cursor so callers still get every row
+const PAGE_LIMIT = 500;
+
+const getAllPages = async (url: string) => {
+    const rows: any[] = [];
+    let cursor: string | undefined;
+    let response;
+    do {
+        response = await api.get(url, { params: { limit: PAGE_LIMIT, cursor } });
+        rows.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return { ...response, data: rows };
+};
+
 // Auth API
 export const authAPI = {
     login: (identifier: string, password: string, role?: string) =>
@@ -55,7 +101,7 @@ export const userAPI = {
         api.put('/users/me/location', { latitude, longitude, address }),
     updateVolunteerStatus: (status: string) =>
         api.put('/users/me/volunteer-status', { status }),
-    getAll: (role?: string) => api.get(`/users/${role ? `?role=${role}` : ''}`),
+    getAll: (role?: string) => getAllPages(`/users/${role ? `?role=${role}` : ''}`),
     getOnlineVolunteers: () => api.get('/users/volunteers/online'),
     updateUser: (id: number, data: any) => api.put(`/users/${id}`, data),
     deleteUser: (id: number) => api.delete(`/users/${id}`),
@@ -64,7 +110,7 @@ export const userAPI = {
 // SOS API
 export const sosAPI = {
     create: (data: any) => api.post('/sos/', data),
-    getAll: (status?: string) => api.get(`/sos/${status ? `?status_filter=${status}` : ''}`),
+    getAll: (status?: string) => getAllPages(`/sos/${status ? `?status_filter=${status}` : ''}`),
     getById: (id: number) => api.get(`/sos/${id}`),
     update: (id: number, data: any) => api.put(`/sos/${id}`, data),
     updateStatus: (id: number, status: string) => api.put(`/sos/${id}/status`, { status }),
@@ -75,7 +121,7 @@ export const sosAPI = {
 export const incidentAPI = {
     create: (data: any) => api.post('/incidents/', data),
     getAll: (status?: string, type?: string) =>
-        api.get(`/incidents/?${status ? `status_filter=${status}` : ''}${type ? `&incident_type=${type}` : ''}`),
+        getAllPages(`/incidents/?${status ? `status_filter=${status}` : ''}${type ? `&incident_type=${type}` : ''}`),
     getById: (id: number) => api.get(`/incidents/${id}`),
     update: (id: number, data: any) => api.put(`/incidents/${id}`, data),
     delete: (id: number) => api.delete(`/incidents/${id}`),
@@ -84,7 +130,7 @@ export const incidentAPI = {
 // Task API
 export const taskAPI = {
     create: (data: any) => api.post('/tasks/', data),
-    getAll: (status?: string) => api.get(`/tasks/${status ? `?status_filter=${status}` : ''}`),
+    getAll: (status?: string) => getAllPages(`/tasks/${status ? `?status_filter=${status}` : ''}`),
     getNearby: () => api.get('/tasks/nearby'),
     getById: (id: number) => api.get(`/tasks/${id}`),
     update: (id: number, data: any) => api.put(`/tasks/${id}`, data),
@@ -98,9 +144,9 @@ export const messageAPI = {
         let qs = '';
         if (taskId) qs = `?task_id=${taskId}`;
         else if (contactId) qs = `?contact_id=${contactId}`;
-        return api.get(`/messages/${qs}`);
+        return getAllPages(`/messages/${qs}`);
     },
-    getBroadcasts: () => api.get('/messages/broadcasts'),
+    getBroadcasts: () => getAllPages('/messages/broadcasts'),
     markRead: (id: number) => api.put(`/messages/${id}/read`),
     getUnreadCount: () => api.get('/messages/unread/count'),
 };
@@ -108,7 +154,7 @@ export const messageAPI = {
 // Comment API
 export const commentAPI = {
     create: (data: any) => api.post('/comments/', data),
-    getTaskComments: (taskId: number) => api.get(`/comments/task/${taskId}`),
+    getTaskComments: (taskId: number) => getAllPages(`/comments/task/${taskId}`),
     delete: (id: number) => api.delete(`/comments/${id}`),
 };
 
@@ -2,6 +2,18 @@ import { io, Socket } from 'socket.io-client';
 
 const SOCKET_URL = process.env.NEXT_PUBLIC_SOCKET_URL || 'http://localhost:8000';
 
+// Apply a versioned delta's changed fields on top of a cached entity (nested objects merge by id)
+function mergeDelta(entity: any, changes: any): any {
+    const merged = { ...entity };
+    for (const [key, value] of Object.entries(changes)) {
+        const current = merged[key];
+        const sameObject = value && current && typeof value === 'object' && !Array.isArray(value)
+            && typeof current === 'object' && (value as any).id === current.id;
+        merged[key] = sameObject ? mergeDelta(current, value) : value;
+    }
+    return merged;
+}
+
 class SocketService {
     private socket: Socket | null = null;
     private listeners: Map<string, Set<Function>> = new Map();
@@ -16,15 +28,12 @@ class SocketService {
             reconnection: true,
             reconnectionAttempts: 5,
             reconnectionDelay: 1000,
+            // The server binds the socket to the user in this access token; read on every (re)connect
+            auth: (cb) => cb(userId ? { token: localStorage.getItem('access_token') } : {}),
         });
 
         this.socket.on('connect', () => {
             console.log('Socket connected:', this.socket?.id);
-
-            // Authenticate if userId provided
-            if (userId) {
-                this.socket?.emit('authenticate', { user_id: userId });
-            }
         });
 
         this.socket.on('disconnect', () => {
@@ -35,9 +44,20 @@ class SocketService {
             console.log('Connection established:', data);
         });
 
+        // Coalesced updates arrive as one [[event, data], ...] frame per tick
+        this.socket.on('batch', (frame: [string, any][]) => {
+            this.dispatchBatch(frame);
+        });
+
         return this.socket;
     }
 
+    private dispatchBatch(frame: [string, any][]) {
+        for (const [event, data] of frame) {
+            this.listeners.get(event)?.forEach((callback) => callback(data));
+        }
+    }
+
     disconnect() {
         if (this.socket) {
             this.socket.disconnect();
@@ -57,6 +77,39 @@ class SocketService {
         });
     }
 
+    // Follow a versioned entity stream (task_updated, incident_updated). Deltas carry
+    // {id, version, base_version, ...changed fields}; when the cached copy is not at
+    // base_version an update was missed, so the full snapshot is fetched instead.
+    // Returns a function that seeds the cache with entities loaded over REST.
+    onVersioned(event: string, fetchSnapshot: (id: number) => Promise<any>, callback: (entity: any) => void) {
+        const entities = new Map<number, any>();
+
+        this.on(event, async (delta: any) => {
+            const cached = entities.get(delta.id);
+            if (cached && cached.version >= delta.version) {
+                return;
+            }
+
+            let entity;
+            if (cached && cached.version === delta.base_version) {
+                const { base_version, ...changes } = delta;
+                entity = mergeDelta(cached, changes);
+            } else {
+                entity = await fetchSnapshot(delta.id);
+            }
+
+            // A newer copy may have arrived while the snapshot was loading
+            const latest = entities.get(delta.id);
+            if (!entity || (latest && latest.version >= entity.version)) {
+                return;
+            }
+            entities.set(delta.id, entity);
+            callback(entity);
+        });
+
+        return (loaded: any[]) => loaded.forEach((entity) => entities.set(entity.id, entity));
+    }
+
     off(event: string, callback?: Function) {
         if (callback) {
             this.listeners.get(event)?.delete(callback);